@@ -0,0 +1,69 @@
+# Denormalized session activity. Every message insert also bumps its
+# session's counters in the same transaction, so the session list shows the
+# last message and message count from one indexed query on chat_sessions.
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+# Characters of the last message kept on the session
+PREVIEW_LENGTH = 120
+
+
+def preview(content):
+    """Single-line preview of a message."""
+    text = " ".join((content or "").split())
+    return text if len(text) <= PREVIEW_LENGTH else text[:PREVIEW_LENGTH - 3].rstrip() + "..."
+
+
+async def add_message(db: AsyncSession, session_id: int, role: str, content: str,
+                      trace_id: str | None = None):
+    """
+    Add a message and update its session's activity; the caller commits both
+    together.
+
+    Returns:
+        models.Message: The pending message
+    """
+    message = models.Message(session_id=session_id, role=role, content=content,
+                             trace_id=trace_id)
+    db.add(message)
+    await db.execute(
+        update(models.ChatSession)
+        .where(models.ChatSession.id == session_id)
+        .values(
+            message_count=models.ChatSession.message_count + 1,
+            last_message_at=func.now(),
+            last_message_preview=preview(content),
+        )
+    )
+    return message
+
+
+def backfill_session_activity(conn):
+    """
+    Compute the activity columns from existing messages; run by
+    `upgrade_schema` when it adds them. Empty sessions take their creation time.
+    """
+    messages = models.Message.__table__
+    sessions = models.ChatSession.__table__
+    latest = (
+        select(messages.c.created_at, messages.c.content)
+        .where(messages.c.session_id == sessions.c.id)
+        .order_by(messages.c.created_at.desc(), messages.c.id.desc())
+        .limit(1)
+    )
+    conn.execute(
+        update(sessions).values(
+            message_count=select(func.count())
+            .where(messages.c.session_id == sessions.c.id)
+            .scalar_subquery(),
+            last_message_at=func.coalesce(
+                latest.with_only_columns(messages.c.created_at).scalar_subquery(),
+                sessions.c.created_at,
+            ),
+            last_message_preview=func.substr(
+                latest.with_only_columns(messages.c.content).scalar_subquery(), 1, PREVIEW_LENGTH
+            ),
+        )
+    )
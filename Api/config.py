@@ -6,10 +6,25 @@ class Settings(BaseSettings):
     database_password: str
     database_name: str
     database_username: str
+    # Full SQLAlchemy URL overriding the Postgres settings above, e.g.
+    # "sqlite:///bench.sqlite3" for the benchmark suite
+    database_url: str | None = None
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
     cors_origins: list[str] = []
+    log_level: str = "INFO"
+    batch_max_questions: int = 500
+    batch_max_concurrency: int = 8
+    page_size: int = 50
+    max_page_size: int = 200
+    # Seconds a user loaded for a token is reused without a database lookup
+    # (0 disables the cache), and how many such users are kept
+    auth_cache_ttl: float = 60
+    auth_cache_max_entries: int = 10000
+    # Seconds between checks for a rebuilt vectorstore on disk, which is then
+    # hot reloaded (0 disables the check)
+    index_reload_interval: float = 30
 
     model_config = {
         "extra": "ignore",
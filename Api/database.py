@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import settings
 
-SQLALCHEMY_DATABASE_URL = (
+SQLALCHEMY_DATABASE_URL = settings.database_url or (
     f"postgresql://{settings.database_username}:"
     f"{settings.database_password}@"
     f"{settings.database_hostname}:"
@@ -10,10 +13,40 @@ SQLALCHEMY_DATABASE_URL = (
     f"{settings.database_name}"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Async driver for each supported database
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url):
+    """
+    The same database as `url` through its async driver, whatever driver
+    `url` names (e.g. "postgresql+psycopg2://..." -> "postgresql+asyncpg://...").
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(
+            f"Unsupported database {backend!r} in DATABASE_URL; "
+            f"expected one of {', '.join(_ASYNC_DRIVERS)}"
+        )
+    return url.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+
+
+ASYNC_SQLALCHEMY_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+
+# SQLite connections are shared with the threadpool that runs sync endpoints
+_CONNECT_ARGS = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=_CONNECT_ARGS)
+
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -22,3 +55,48 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def upgrade_schema(metadata, bind=engine, backfills=None):
+    """
+    Create missing tables, then add columns and indexes that were added to
+    existing tables' models since they were created (`create_all` skips those).
+    Indexes named like the models' own (`ix_<table>_...`) that a model no
+    longer declares are dropped; other indexes are left alone.
+
+    Args:
+        metadata (MetaData): Tables to upgrade, i.e. `models.Base.metadata`;
+            passing it makes callers import the models that register them
+        bind: Engine to upgrade
+        backfills (dict): "table.column" -> function(connection), run in the
+            same transaction after that column is added to an existing table
+    """
+    backfills = backfills or {}
+    metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        added = []
+        for table in metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                    added.append(f"{table.name}.{column.name}")
+        for name in added:
+            if name in backfills:
+                backfills[name](conn)
+        for table in metadata.sorted_tables:
+            declared = {index.name for index in table.indexes}
+            for index in inspector.get_indexes(table.name):
+                name = index["name"]
+                if name.startswith(f"ix_{table.name}_") and name not in declared \
+                        and not index.get("duplicates_constraint"):
+                    conn.exec_driver_sql(
+                        f"DROP INDEX {conn.dialect.identifier_preparer.quote(name)}"
+                    )
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
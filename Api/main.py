@@ -1,14 +1,70 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .database import engine
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from .activity import backfill_session_activity
+from .database import upgrade_schema
 from . import models
 from .routers import auth, chat
 from fastapi.middleware.cors import CORSMiddleware
 from .routers import users
 from .config import settings
+from src.observability.metrics import render_metrics
 
-app = FastAPI(title="Chatbot API")
+logging.basicConfig(
+    level=settings.log_level.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def warm_retrieval():
+    """Load the graph, embedding model and vectorstore before serving traffic."""
+    try:
+        chat.get_graph_app()
+        from src.rags.rag import warm_vectorstore
+        from src.route.embedroute import get_embedding_router
+        from src.rags.rerank import get_reranker
+        warm_vectorstore()
+        get_embedding_router().classify("Sunmarke School")
+        get_reranker()
+        from src.llms.llm import get_llm
+        get_llm()
+    except Exception as e:
+        # Chat requests report the failure themselves; auth routes keep working.
+        logger.warning("Retrieval warm-up failed: %s", e)
+
+
+async def reload_index_periodically(interval):
+    """Hot reload the vectorstore whenever a rebuilt index lands on disk."""
+    from src.rags.rag import reload_vectorstore
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await run_in_threadpool(reload_vectorstore, True):
+                logger.info("Reloaded the rebuilt vectorstore")
+        except Exception as e:
+            # The previous index stays installed; the next check tries again
+            logger.warning("Vectorstore reload failed: %s", e)
 
-models.Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(warm_retrieval)
+    reloader = None
+    if settings.index_reload_interval > 0:
+        reloader = asyncio.create_task(reload_index_periodically(settings.index_reload_interval))
+    yield
+    if reloader is not None:
+        reloader.cancel()
+
+
+app = FastAPI(title="Chatbot API", lifespan=lifespan)
+
+upgrade_schema(models.Base.metadata,
+               backfills={"chat_sessions.message_count": backfill_session_activity})
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,3 +83,8 @@ app.include_router(users.router)
 @app.get("/")
 def root():
     return {"message": "Chatbot API Running"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Graph, token and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, func
+from sqlalchemy import Column, Index, Integer, String, Text, ForeignKey, TIMESTAMP, func
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -17,9 +17,23 @@ class ChatSession(Base):
     title = Column(String, default="New Chat")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    # Rolling summary of the conversation up to message `summarized_through`
+    # (src/memory/conversation.py); later messages are sent verbatim
+    summary = Column(Text)
+    summarized_through = Column(Integer)
+    # Activity kept by Api/activity.py with every message insert: time of the
+    # latest message (creation time while empty), its preview and the count
+    last_message_at = Column(TIMESTAMP(timezone=True))
+    last_message_preview = Column(String)
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     messages = relationship("Message", back_populates="session")
 
+    # Serves the session list, most recently active first (Api/pagination.py)
+    __table_args__ = (
+        Index("ix_chat_sessions_user_id_last_message_at", "user_id", "last_message_at", "id"),
+    )
+
 class Message(Base):
     __tablename__ = "messages"
 
@@ -28,5 +42,12 @@ class Message(Base):
     role = Column(String)  # user or assistant
     content = Column(String)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    # Request trace (src/observability/tracing.py) that produced the message
+    trace_id = Column(String(32), index=True)
 
     session = relationship("ChatSession", back_populates="messages")
+
+    # Serves the keyset-paginated message history (Api/pagination.py)
+    __table_args__ = (
+        Index("ix_messages_session_id_created_at", "session_id", "created_at", "id"),
+    )
@@ -1,7 +1,11 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from .config import settings
 from .database import get_db
@@ -15,26 +19,124 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme),
-                     db: Session = Depends(get_db)):
 
-    credentials_exception = HTTPException(
+class PrincipalCache:
+    """
+    In-process LRU of users verified against the database, keyed by
+    (user id, token iat) and trusted for `ttl` seconds. Entries for a user are
+    dropped when the user is updated or deleted through the ORM; changes made
+    by other processes or bulk statements show up once the entry expires.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (user_id, iat) -> (user, stored_at)
+        # Bumped by every invalidation, so a lookup that raced one is not stored
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, user, generation):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (user, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(settings.auth_cache_ttl, settings.auth_cache_max_entries)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_principal(mapper, connection, target):
+    # Covers password and email changes as well as deletion
+    principal_cache.invalidate(target.id)
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials"
     )
 
+def decode_access_token(token: str):
+    """
+    Verify a token's signature and expiry.
+
+    Returns:
+        dict: The token claims; raises 401 if the token is invalid
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if not isinstance(payload.get("user_id"), int):
+        raise _credentials_exception()
+    return payload
+
+def get_current_user_id(token: str = Depends(oauth2_scheme)):
+    """
+    The caller's user id from the token claims alone, without a database
+    round-trip. A deleted user's token keeps passing here until it expires,
+    so endpoints using it must reach everything through rows owned by the
+    user id, such as a chat session looked up with its user_id: those rows
+    are deleted with the user (ON DELETE CASCADE), and the lookup then
+    fails. They may write beneath such a row (messages of a session).
+    Endpoints that create a user's top-level rows or spend LLM and search
+    quota without such a lookup use `get_current_user`.
+    """
+    return decode_access_token(token)["user_id"]
+
+def get_current_user(token: str = Depends(oauth2_scheme),
+                     db: Session = Depends(get_db)):
+    """
+    The caller's user, loaded from the database at most once per token every
+    `auth_cache_ttl` seconds. The user is detached and shared between
+    requests; treat it as read-only.
+    """
+    payload = decode_access_token(token)
+    key = (payload["user_id"], payload.get("iat"))
+    user = principal_cache.get(key)
+    if user is not None:
+        return user
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    generation = principal_cache.generation
+    user = db.query(models.User).filter(models.User.id == key[0]).first()
     if not user:
-        raise credentials_exception
+        raise _credentials_exception()
 
+    db.expunge(user)
+    principal_cache.set(key, user, generation)
     return user
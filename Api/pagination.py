@@ -0,0 +1,59 @@
+# Keyset (cursor) pagination, newest first on (timestamp, id). Each page is
+# an index range scan of `limit` rows however deep it is, unlike OFFSET, and
+# rows inserted while a client pages do not shift later pages.
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import func, tuple_
+
+
+def encode_cursor(timestamp, id):
+    """Opaque cursor pointing just past the row (timestamp, id)."""
+    payload = json.dumps([timestamp.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) from a cursor; a malformed cursor is a 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(db, query, sort_column, id_column, cursor=None, limit=50):
+    """
+    Fetch one page of `query`, newest first.
+
+    Args:
+        db (Session): Database session
+        query (Select): Select of the page's columns (including both sort
+            columns), already filtered
+        sort_column: Non-null timestamp column of the sort key
+        id_column: Primary key column, breaking timestamp ties
+        cursor (str | None): `next_cursor` of the previous page
+        limit (int): Page size
+
+    Returns:
+        tuple: (rows, next_cursor); next_cursor is None on the last page
+    """
+    if cursor:
+        timestamp, last_id = decode_cursor(cursor)
+        column, value = sort_column, timestamp
+        if db.get_bind().dialect.name == "sqlite":
+            # SQLite keeps timestamps as text, with or without fractional
+            # seconds depending on who wrote them; compare them as numbers
+            column, value = func.julianday(sort_column), func.julianday(timestamp.isoformat(" "))
+        query = query.where(tuple_(column, id_column) < tuple_(value, last_id))
+
+    query = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+    rows = db.execute(query).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
@@ -1,8 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .. import models, oauth2, schemas
-from ..database import get_db
+from ..config import settings
+from ..activity import add_message
+from ..database import get_db, get_async_db, AsyncSessionLocal
+from ..pagination import paginate
 from functools import lru_cache
+from src.observability.tracing import trace_request, new_trace_id
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
@@ -12,68 +25,325 @@ def get_graph_app():
     from src.graphs.graph import app
     return app
 
-@router.post("/session")
+
+@lru_cache(maxsize=1)
+def get_answer_fn():
+    from src.graphs.graph import aanswer_question
+    return aanswer_question
+
+
+@lru_cache(maxsize=1)
+def get_batch_fn():
+    from src.graphs.batch import run_batch
+    return run_batch
+
+@router.post("/session", response_model=schemas.SessionOut)
 def create_session(db: Session = Depends(get_db),
                    current_user: models.User = Depends(oauth2.get_current_user)):
 
-    session = models.ChatSession(user_id=current_user.id)
+    # An empty session sorts by its creation time until its first message
+    session = models.ChatSession(user_id=current_user.id, last_message_at=func.now())
     db.add(session)
     db.commit()
     db.refresh(session)
 
     return session
 
-@router.get("/sessions")
-def get_sessions(db: Session = Depends(get_db),
-                 current_user: models.User = Depends(oauth2.get_current_user)):
+@router.get("/sessions", response_model=schemas.SessionPage, response_class=ORJSONResponse)
+def get_sessions(cursor: str | None = None,
+                 limit: int = Query(settings.page_size, ge=1, le=settings.max_page_size),
+                 db: Session = Depends(get_db),
+                 user_id: int = Depends(oauth2.get_current_user_id)):
+    """
+    The user's sessions with their last message preview and message count,
+    most recently active first, one page at a time. A session that becomes
+    active while a client pages moves to the first page.
+    """
+    rows, next_cursor = paginate(
+        db,
+        select(models.ChatSession.id, models.ChatSession.title, models.ChatSession.created_at,
+               models.ChatSession.last_message_at, models.ChatSession.last_message_preview,
+               models.ChatSession.message_count)
+        .where(models.ChatSession.user_id == user_id),
+        models.ChatSession.last_message_at, models.ChatSession.id, cursor, limit,
+    )
+    # Rows already have the SessionOut fields; skip re-validating them
+    return ORJSONResponse({"items": [row._asdict() for row in rows], "next_cursor": next_cursor})
+
+@router.post("/batch")
+async def chat_batch(payload: schemas.BatchRequest,
+                     current_user: models.User = Depends(oauth2.get_current_user)):
+    """
+    Answer many questions at once, streaming one JSON line per question as it
+    finishes (see src/graphs/batch.py). Answers are not saved to any session.
+    """
+    if len(payload.questions) > settings.batch_max_questions:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.batch_max_questions} questions per batch"
+        )
+    concurrency = min(payload.max_concurrency or settings.batch_max_concurrency,
+                      settings.batch_max_concurrency)
+    items = [
+        {"id": q.id if q.id is not None else i, "question": q.question}
+        for i, q in enumerate(payload.questions)
+    ]
+
+    try:
+        run_batch = await run_in_threadpool(get_batch_fn)
+    except Exception:
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service is temporarily unavailable"
+        )
+
+    async def lines():
+        async for record in run_batch(items, max(1, concurrency)):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def _unsummarized_messages(db: AsyncSession, session: models.ChatSession, limit=None):
+    """(id, role, content) rows after the session summary, newest first."""
+    query = (
+        select(models.Message.id, models.Message.role, models.Message.content)
+        .where(models.Message.session_id == session.id,
+               models.Message.id > (session.summarized_through or 0))
+        .order_by(models.Message.id.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return (await db.execute(query)).all()
+
+
+async def _load_history(db: AsyncSession, session: models.ChatSession):
+    """Bounded conversation history for the next question in `session`."""
+    from src.memory.conversation import build_history, recent_message_limit
+
+    rows = await _unsummarized_messages(db, session, limit=recent_message_limit())
+    return build_history(session.summary, [(row.role, row.content) for row in reversed(rows)])
+
+
+async def _refresh_summary(session_id: int):
+    """
+    Fold messages that left the recent window into the session summary. Runs
+    after the response is sent; a concurrent refresh that got there first wins.
+    """
+    from src.memory.conversation import asummarize, recent_message_limit
+
+    async with AsyncSessionLocal() as db:
+        session = await db.get(models.ChatSession, session_id)
+        if session is None:
+            return
+        rows = await _unsummarized_messages(db, session)
+        older = rows[recent_message_limit():][::-1]
+        if not older:
+            return
+        try:
+            summary = await asummarize(session.summary, [(row.role, row.content) for row in older])
+        except Exception as e:
+            logger.warning("Summarizing session %s failed: %s", session_id, e)
+            return
+        await db.execute(
+            update(models.ChatSession)
+            .where(models.ChatSession.id == session_id,
+                   func.coalesce(models.ChatSession.summarized_through, 0)
+                   == (session.summarized_through or 0))
+            .values(summary=summary, summarized_through=older[-1].id)
+        )
+        await db.commit()
 
-    return db.query(models.ChatSession)\
-        .filter(models.ChatSession.user_id == current_user.id)\
-        .all()
 
 @router.post("/{session_id}")
-def chat(session_id: int,
-         payload: schemas.MessageCreate,
-         db: Session = Depends(get_db),
-         current_user: models.User = Depends(oauth2.get_current_user)):
+async def chat(session_id: int,
+               payload: schemas.MessageCreate,
+               background_tasks: BackgroundTasks,
+               db: AsyncSession = Depends(get_async_db),
+               user_id: int = Depends(oauth2.get_current_user_id)):
     message = payload.message
 
-    session = db.query(models.ChatSession)\
-        .filter(models.ChatSession.id == session_id,
-                models.ChatSession.user_id == current_user.id)\
-        .first()
+    session = await db.scalar(
+        select(models.ChatSession)
+        .where(models.ChatSession.id == session_id,
+               models.ChatSession.user_id == user_id)
+    )
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    db.add(models.Message(session_id=session_id, role="user", content=message))
-    db.commit()
+    history = await _load_history(db, session)
+
+    with trace_request() as trace:
+        await add_message(db, session_id, "user", message, trace.trace_id)
+        await db.commit()
+
+        try:
+            # First use imports the graph and its models; keep that off the event loop
+            answer_question = await run_in_threadpool(get_answer_fn)
+            final_state = await answer_question(
+                message,
+                config={"recursion_limit": 12},
+                history=history,
+            )
+        except Exception:
+            raise HTTPException(
+                status_code=503,
+                detail="Chat service is temporarily unavailable"
+            )
+        response = final_state["generation"]
 
+        await add_message(db, session_id, "assistant", response, trace.trace_id)
+        await db.commit()
+
+    background_tasks.add_task(_refresh_summary, session_id)
+    return {"response": response, "trace_id": trace.trace_id}
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_answer(graph_app, session_id: int, message: str, trace_id: str, history):
+    """
+    Run the graph and translate its events into Server-Sent Events.
+
+    Emits `node` events as graph nodes start and finish, `token` events for
+    the answer as the LLM produces it, then a single `done` (or `error`)
+    event. When the graders send the graph back into `generate`, a new
+    `node` start event precedes the regenerated tokens, so clients should
+    reset the partial answer on it.
+    """
+    with trace_request(trace_id):
+        async for chunk in _stream_graph_events(graph_app, session_id, message, trace_id,
+                                                history):
+            yield chunk
+
+
+async def _stream_graph_events(graph_app, session_id: int, message: str, trace_id: str,
+                               history):
+    from src.route.reposnse import ANSWER_TAG
+    from src.cache.semantic import get_semantic_cache
+    from src.graphs.graph import graph_input, is_cacheable
+    from src.memory.conversation import acondense_question
+    from src.observability.tracing import current_trace
+
+    # Follow-ups are cached, routed and retrieved as stand-alone questions
+    message = await acondense_question(message, history)
+    cache = get_semantic_cache()
+    response = await asyncio.to_thread(cache.lookup, message) if cache is not None else None
+    if response is not None:
+        current_trace().datasource = "cache"
+        async with AsyncSessionLocal() as db:
+            await add_message(db, session_id, "assistant", response, trace_id)
+            await db.commit()
+        yield _sse("token", {"content": response})
+        yield _sse("done", {"response": response, "cached": True, "trace_id": trace_id})
+        return
+
+    final_state = {}
     try:
-        graph_app = get_graph_app()
-        final_state = graph_app.invoke(
-            {"question": message},
-            config={"recursion_limit": 12}
-        )
+        async for event in graph_app.astream_events(
+            graph_input(message, history),
+            config={"recursion_limit": 12},
+            version="v2",
+        ):
+            kind = event["event"]
+            # Node runs are the direct children of the graph run; LangGraph's
+            # own nodes (e.g. "__start__") are not reported
+            is_node = len(event.get("parent_ids", [])) == 1 \
+                and event["name"] == event.get("metadata", {}).get("langgraph_node") \
+                and not event["name"].startswith("__")
+
+            if kind == "on_chain_start" and is_node:
+                yield _sse("node", {"node": event["name"], "status": "start"})
+            elif kind == "on_chain_end" and is_node:
+                output = event["data"].get("output")
+                if isinstance(output, dict):
+                    final_state.update(output)
+                    if output.get("generation"):
+                        response = output["generation"]
+                yield _sse("node", {"node": event["name"], "status": "end"})
+            elif kind == "on_chat_model_stream" and ANSWER_TAG in event.get("tags", []):
+                content = event["data"]["chunk"].content
+                if content:
+                    yield _sse("token", {"content": content})
+    except Exception:
+        logger.exception("Streaming chat failed for session %s (trace %s)", session_id, trace_id)
+        response = None
+
+    if response is None:
+        yield _sse("error", {"detail": "Chat service is temporarily unavailable"})
+        return
+
+    if cache is not None and is_cacheable(final_state):
+        await asyncio.to_thread(cache.store, message, response)
+
+    async with AsyncSessionLocal() as db:
+        await add_message(db, session_id, "assistant", response, trace_id)
+        await db.commit()
+
+    yield _sse("done", {"response": response, "trace_id": trace_id})
+
+
+@router.post("/{session_id}/stream")
+async def chat_stream(session_id: int,
+                      payload: schemas.MessageCreate,
+                      background_tasks: BackgroundTasks,
+                      db: AsyncSession = Depends(get_async_db),
+                      user_id: int = Depends(oauth2.get_current_user_id)):
+    message = payload.message
+
+    session = await db.scalar(
+        select(models.ChatSession)
+        .where(models.ChatSession.id == session_id,
+               models.ChatSession.user_id == user_id)
+    )
+
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    history = await _load_history(db, session)
+
+    trace_id = new_trace_id()
+    await add_message(db, session_id, "user", message, trace_id)
+    await db.commit()
+
+    try:
+        graph_app = await run_in_threadpool(get_graph_app)
     except Exception:
         raise HTTPException(
             status_code=503,
             detail="Chat service is temporarily unavailable"
         )
-    response = final_state["generation"]
 
-    db.add(models.Message(session_id=session_id, role="assistant", content=response))
-    db.commit()
-
-    return {"response": response}
+    # Runs once the stream has finished
+    background_tasks.add_task(_refresh_summary, session_id)
+    return StreamingResponse(
+        _stream_answer(graph_app, session_id, message, trace_id, history),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@router.get("/{session_id}/messages")
+@router.get("/{session_id}/messages", response_model=schemas.MessagePage,
+            response_class=ORJSONResponse)
 def get_messages(session_id: int,
+                 cursor: str | None = None,
+                 limit: int = Query(settings.page_size, ge=1, le=settings.max_page_size),
                  db: Session = Depends(get_db),
-                 current_user: models.User = Depends(oauth2.get_current_user)):
+                 user_id: int = Depends(oauth2.get_current_user_id)):
+    """A session's messages, newest first, one page at a time."""
+    owned = db.scalar(
+        select(models.ChatSession.id)
+        .where(models.ChatSession.id == session_id,
+               models.ChatSession.user_id == user_id)
+    )
+    if owned is None:
+        raise HTTPException(status_code=404, detail="Session not found")
 
-    return db.query(models.Message)\
-        .join(models.ChatSession)\
-        .filter(models.ChatSession.id == session_id,
-                models.ChatSession.user_id == current_user.id)\
-        .all()
+    rows, next_cursor = paginate(
+        db,
+        select(models.Message.id, models.Message.role, models.Message.content,
+               models.Message.created_at)
+        .where(models.Message.session_id == session_id),
+        models.Message.created_at, models.Message.id, cursor, limit,
+    )
+    return ORJSONResponse({"items": [row._asdict() for row in rows], "next_cursor": next_cursor})
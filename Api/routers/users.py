@@ -20,9 +20,9 @@ def get_current_user(
 def get_user(
     id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    user_id: int = Depends(oauth2.get_current_user_id)
 ):
-    if id != current_user.id:
+    if id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this user"
@@ -41,7 +41,7 @@ def get_user(
 @router.get("/", response_model=list[schemas.UserOut])
 def get_all_users(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    user_id: int = Depends(oauth2.get_current_user_id)
 ):
-    users = db.query(models.User).filter(models.User.id == current_user.id).all()
+    users = db.query(models.User).filter(models.User.id == user_id).all()
     return users
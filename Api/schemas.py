@@ -25,3 +25,40 @@ class SessionCreate(BaseModel):
 
 class MessageCreate(BaseModel):
     message: str
+
+class SessionOut(BaseModel):
+    id: int
+    title: str | None = None
+    created_at: datetime | None = None
+    last_message_at: datetime | None = None
+    last_message_preview: str | None = None
+    message_count: int = 0
+
+    class Config:
+        orm_mode = True
+
+class MessageOut(BaseModel):
+    id: int
+    role: str
+    content: str
+    created_at: datetime | None = None
+
+    class Config:
+        orm_mode = True
+
+# Keyset-paginated lists, newest first; pass next_cursor back as ?cursor=
+class SessionPage(BaseModel):
+    items: list[SessionOut]
+    next_cursor: str | None = None
+
+class MessagePage(BaseModel):
+    items: list[MessageOut]
+    next_cursor: str | None = None
+
+class BatchQuestion(BaseModel):
+    id: int | str | None = None
+    question: str
+
+class BatchRequest(BaseModel):
+    questions: list[BatchQuestion]
+    max_concurrency: int | None = None
@@ -0,0 +1,206 @@
+"""
+Deterministic local stand-ins for Groq and Tavily, with configurable latency.
+
+`install()` must run before the first question is answered, since the chains
+are built on first use from the shared client in `src.llms.llm`.
+Answers and grader verdicts are derived from a hash of the prompt, so the
+same question takes the same path through the graph on every run.
+
+Latency specs are "fixed:MS", "uniform:LOW_MS:HIGH_MS" or
+"lognormal:MEDIAN_MS:SIGMA" (e.g. "lognormal:600:0.4").
+"""
+import asyncio
+import hashlib
+import math
+import os
+import random
+import time
+from typing import Any, List, Optional
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+
+def _digest(text):
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+class Latency:
+    """A latency distribution, sampled deterministically from a key."""
+
+    def __init__(self, spec="fixed:0"):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution {spec!r}")
+        self.spec = spec
+
+    def sample(self, key):
+        """Seconds to wait for a call identified by `key`."""
+        rng = random.Random(_digest(key))
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(self.params[0], self.params[1])
+        else:
+            median, sigma = self.params
+            ms = median * math.exp(rng.gauss(0.0, sigma))
+        return ms / 1000.0
+
+
+def _prompt_text(messages):
+    return "\n".join(str(m.content) for m in messages)
+
+
+def _words(text):
+    return max(1, len(text.split()))
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering from a prompt hash after a simulated delay."""
+
+    latency: Any = None
+    yes_rate: float = 0.85
+    answer_words: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _reply(self, messages):
+        from src.memory.conversation import FOLLOW_UP_LABEL
+
+        prompt = _prompt_text(messages)
+        if FOLLOW_UP_LABEL in prompt:
+            # Condensing a follow-up: treat the question as already stand-alone
+            content = prompt.rsplit(FOLLOW_UP_LABEL, 1)[1].split("\n", 1)[0].strip()
+        else:
+            seed = _digest(prompt)
+            words = [f"w{(seed >> (i % 48)) % 997}" for i in range(self.answer_words)]
+            content = "Sunmarke School " + " ".join(words) + "."
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": _words(prompt),
+                "output_tokens": _words(content),
+                "total_tokens": _words(prompt) + _words(content),
+            },
+        )
+        return prompt, ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        prompt, result = self._reply(messages)
+        time.sleep(self.latency.sample(prompt))
+        return result
+
+    async def _agenerate(self, messages, stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs):
+        prompt, result = self._reply(messages)
+        await asyncio.sleep(self.latency.sample(prompt))
+        return result
+
+    def _verdict(self, text, field):
+        """Pydantic field value for a structured-output schema."""
+        if field == "datasource":
+            return "vectorstore"
+        rng = random.Random(_digest(field + text))
+        return "yes" if rng.random() < self.yes_rate else "no"
+
+    def with_structured_output(self, schema, **kwargs):
+        def parse(value):
+            text = value.to_string() if hasattr(value, "to_string") else str(value)
+            return schema(**{name: self._verdict(text, name) for name in schema.model_fields})
+
+        def structured(value):
+            result = parse(value)
+            time.sleep(self.latency.sample(str(value)))
+            return result
+
+        async def astructured(value):
+            result = parse(value)
+            await asyncio.sleep(self.latency.sample(str(value)))
+            return result
+
+        return RunnableLambda(structured, afunc=astructured, name="fake_structured_output")
+
+
+class FakeSearchProvider:
+    """
+    Web search provider (see `src.route.websearch.SearchProvider`) returning
+    {"url", "content"} results after a simulated delay.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def _results(self, query, max_results):
+        self.calls += 1
+        return [
+            {
+                "url": f"https://example.com/{_digest(query) % 10000}/{i}",
+                "content": f"Summary {i} about {query}.",
+            }
+            for i in range(max_results)
+        ]
+
+    def search(self, query, max_results):
+        time.sleep(self.latency.sample(query))
+        return self._results(query, max_results)
+
+    async def asearch(self, query, max_results):
+        await asyncio.sleep(self.latency.sample(query))
+        return self._results(query, max_results)
+
+    def close(self):
+        pass
+
+
+def install(llm_latency="lognormal:400:0.4", search_latency="lognormal:700:0.5", yes_rate=0.85):
+    """
+    Route every Groq and Tavily call in this process to the fakes.
+
+    Returns:
+        tuple: (FakeChatModel, FakeSearchProvider)
+    """
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+    llm = FakeChatModel(latency=Latency(llm_latency), yes_rate=yes_rate)
+    search = FakeSearchProvider(Latency(search_latency))
+
+    from src.llms import llm as llm_module
+    from src.route import websearch
+
+    llm_module.Groqllm.get_llm = lambda self: llm
+    llm_module.get_llm.cache_clear()
+    # The real wrapper stays in place, so its cache and deadline are measured too
+    websearch.get_search_provider = lambda: search
+    websearch.get_web_search_tool.cache_clear()
+    return llm, search
+
+
+class NormalizedFakeEmbedding(DeterministicFakeEmbedding):
+    """
+    Hashed Gaussian vectors scaled to unit length, like the MiniLM model's
+    (normalize_embeddings=True), so cosine thresholds in the semantic cache
+    and embedding router mean the same as in production.
+    """
+
+    def _get_embedding(self, seed):
+        vector = super()._get_embedding(seed)
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+
+def use_fake_embeddings(size=384):
+    """Swap the sentence-transformers model for hashed vectors (no model download)."""
+    from src.rags import rag
+
+    rag._embeddings = NormalizedFakeEmbedding(size=size)
@@ -0,0 +1,81 @@
+"""
+Import-time budget for the graph, measured with `python -X importtime` in a
+fresh interpreter with GROQ_API_KEY and TAVILY_API_KEY unset. Importing must
+not build LLM or search clients, so the SDKs listed in LAZY_MODULES must not
+appear. Exits non-zero when the budget is exceeded or a lazy module is
+imported, so it can gate a deploy.
+
+    python -m benchmarks.import_time [--module src.graphs.graph] [--budget-ms 1500]
+                                     [--repeat 3] [--top 15]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Client SDKs that should only load when a chain or the search tool is first used
+LAZY_MODULES = ("langchain_groq", "groq", "langchain_tavily")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_profile(module):
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        list: (module, self_us, cumulative_us, depth) in import order
+    """
+    env = {k: v for k, v in os.environ.items() if k not in ("GROQ_API_KEY", "TAVILY_API_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.import_time")
+    parser.add_argument("--module", default="src.graphs.graph")
+    parser.add_argument("--budget-ms", type=float, default=1500.0,
+                        help="maximum cumulative import time of --module")
+    parser.add_argument("--repeat", type=int, default=3, help="take the fastest of N runs")
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    args = parser.parse_args(argv)
+
+    profiles = [import_profile(args.module) for _ in range(args.repeat)]
+    rows = min(profiles, key=lambda r: next(c for n, _, c, _ in r if n == args.module))
+    total_ms = next(c for n, _, c, _ in rows if n == args.module) / 1000
+
+    print(f"{'import':45s} {'cumulative ms':>14s} {'self ms':>9s}")
+    top_level = sorted((r for r in rows if r[3] <= 1), key=lambda r: r[2], reverse=True)
+    for name, self_us, cumulative_us, _ in top_level[:args.top]:
+        print(f"{name:45s} {cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}")
+
+    failures = []
+    loaded = sorted({n for n, *_ in rows if n.split(".")[0] in LAZY_MODULES})
+    if loaded:
+        failures.append(f"imported at module load: {', '.join(loaded)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"{args.module} took {total_ms:.0f} ms, budget {args.budget_ms:.0f} ms")
+
+    print(f"\n{args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
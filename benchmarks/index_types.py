@@ -0,0 +1,86 @@
+"""
+Compressed FAISS index types against the exact flat index.
+
+The saved index's vectors are rebuilt as every INDEX_TYPE and queried with
+the synthetic questions of `retrieval_eval`. Recall@k is the overlap with
+the flat index's top k; memory is the serialized index size. --scale N adds
+N - 1 jittered copies of the corpus to approximate a larger site.
+
+    python -m benchmarks.index_types [--k 4] [--scale 100]
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.retrieval_eval import load_questions, synthetic_questions
+from src.rags.rag import VECTORSTORE_PATH, get_embeddings
+from src.rags.store import INDEX_TYPES, build_faiss_index, load_vectorstore
+
+
+def corpus_vectors(scale, noise=0.02, seed=0):
+    vectorstore = load_vectorstore(VECTORSTORE_PATH, get_embeddings())
+    index = vectorstore.index
+    vectors = index.reconstruct_n(0, index.ntotal)
+    if scale > 1:
+        rng = np.random.default_rng(seed)
+        copies = [vectors]
+        for _ in range(scale - 1):
+            jittered = vectors + rng.normal(0, noise, vectors.shape).astype(np.float32)
+            copies.append(jittered / np.linalg.norm(jittered, axis=1, keepdims=True))
+        vectors = np.concatenate(copies)
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def measure(index, queries, k, exact):
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+    latencies.sort()
+    recall = np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)])
+    return {
+        "recall": float(recall),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "bytes": len(faiss.serialize_index(index)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.index_types")
+    parser.add_argument("--questions", default=None)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    args = parser.parse_args(argv)
+
+    questions = load_questions(args.questions) if args.questions else synthetic_questions()
+    queries = np.asarray(
+        get_embeddings().embed_documents([q["question"] for q in questions]), dtype=np.float32
+    )
+    vectors = corpus_vectors(args.scale)
+    faiss.omp_set_num_threads(1)
+
+    exact_index = build_faiss_index(vectors, "flat")
+    _, exact = exact_index.search(queries, args.k)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    print(f"{'index':10s} {'build s':>8s} {'recall':>7s} {'p50 ms':>7s} {'p95 ms':>7s} {'size MB':>8s}")
+    for index_type in args.types:
+        start = time.perf_counter()
+        index = build_faiss_index(vectors, index_type)
+        build_seconds = time.perf_counter() - start
+        result = measure(index, queries, args.k, exact)
+        print(
+            f"{index_type:10s} {build_seconds:8.2f} {result['recall']:7.3f}"
+            f" {result['p50_ms']:7.3f} {result['p95_ms']:7.3f} {result['bytes'] / 1e6:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+End-to-end load test of the API against fake LLM and search backends.
+
+The FastAPI app runs in process on a fresh SQLite database (or --database-url,
+e.g. a local Postgres) and is driven through httpx's ASGI transport. After
+registering users and opening a chat session each, /login and /chat/{id}
+requests are started at a fixed rate whether or not earlier ones finished
+(open loop), so queueing shows up as latency. Reports p50/p95/p99 and
+throughput per endpoint, then the mean time per graph step from /metrics.
+
+    python -m benchmarks.load_api [--rps 5] [--duration 30] [--users 10]
+                                  [--llm-latency lognormal:400:0.4] [--fake-embeddings]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_PASSWORD = "benchmark-password"
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, min(len(sorted_values), round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def configure_environment(args):
+    """Settings the API and graph read at import time."""
+    database_url = args.database_url or "sqlite:///" + str(
+        Path(tempfile.mkdtemp(prefix="sunmarke-bench-")) / "bench.sqlite3"
+    )
+    os.environ["DATABASE_URL"] = database_url
+    for name in ("DATABASE_HOSTNAME", "DATABASE_PASSWORD", "DATABASE_NAME", "DATABASE_USERNAME"):
+        os.environ.setdefault(name, "benchmark")
+    os.environ.setdefault("DATABASE_PORT", "5432")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.no_caches:
+        os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+        os.environ["LLM_CACHE_BACKEND"] = "off"
+        os.environ["WEB_SEARCH_CACHE_TTL"] = "0"
+    return database_url
+
+
+def load_questions(path):
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line)["question"] for line in f if line.strip()]
+    from benchmarks.retrieval_eval import synthetic_questions
+    return [q["question"] for q in synthetic_questions()] + [
+        "hello there",
+        "thanks, that helps",
+        "What is the latest news in AI?",
+    ]
+
+
+async def setup_users(client, count):
+    """Register users and open one chat session each; returns (email, token, session_id)."""
+    users = []
+    for i in range(count):
+        email = f"bench{i}@example.com"
+        response = await client.post("/register", json={"email": email, "password": BENCH_PASSWORD})
+        if response.status_code not in (200, 409):
+            response.raise_for_status()
+        token = await login(client, email)
+        response = await client.post("/chat/session", headers=_auth(token))
+        response.raise_for_status()
+        users.append((email, token, response.json()["id"]))
+    return users
+
+
+def _auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def login(client, email):
+    response = await client.post("/login", data={"username": email, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def timed(results, endpoint, request):
+    start = time.perf_counter()
+    try:
+        response = await request
+        ok = response.status_code < 400
+    except Exception:
+        ok = False
+    results.append((endpoint, ok, time.perf_counter() - start, time.perf_counter()))
+
+
+async def drive(client, users, questions, rps, duration, login_ratio, seed):
+    """Start requests on an open-loop schedule; returns (results, wall seconds, max lag)."""
+    rng = random.Random(seed)
+    results, tasks = [], []
+    total = int(rps * duration)
+    start = time.perf_counter()
+    max_lag = 0.0
+    for i in range(total):
+        delay = start + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            max_lag = max(max_lag, -delay)
+        email, token, session_id = users[i % len(users)]
+        if rng.random() < login_ratio:
+            request = client.post("/login", data={"username": email, "password": BENCH_PASSWORD})
+            endpoint = "/login"
+        else:
+            request = client.post(
+                f"/chat/{session_id}", json={"message": rng.choice(questions)}, headers=_auth(token)
+            )
+            endpoint = "/chat/{session_id}"
+        tasks.append(asyncio.create_task(timed(results, endpoint, request)))
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start, max_lag
+
+
+_SAMPLE = re.compile(r'^(\w+)\{([^}]*)\} (\S+)$')
+
+
+def parse_metrics(text):
+    """{(metric, labels): value} for every labelled sample in a /metrics page."""
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[(name, labels)] = float(value)
+    return samples
+
+
+def report(results, wall_seconds, max_lag, metrics_text):
+    print(f"\n{'endpoint':20s} {'count':>6s} {'errors':>6s} {'p50 ms':>8s} {'p95 ms':>8s}"
+          f" {'p99 ms':>8s} {'req/s':>7s}")
+    for endpoint in sorted({r[0] for r in results}):
+        rows = [r for r in results if r[0] == endpoint]
+        latencies = sorted(r[2] * 1000 for r in rows if r[1])
+        errors = sum(not r[1] for r in rows)
+        print(
+            f"{endpoint:20s} {len(rows):6d} {errors:6d} {percentile(latencies, 50):8.1f}"
+            f" {percentile(latencies, 95):8.1f} {percentile(latencies, 99):8.1f}"
+            f" {len(latencies) / wall_seconds:7.2f}"
+        )
+    print(f"wall time {wall_seconds:.1f}s, max schedule lag {max_lag * 1000:.1f} ms")
+
+    samples = parse_metrics(metrics_text)
+    print(f"\n{'graph step':45s} {'calls':>6s} {'mean ms':>8s}")
+    for (name, labels), count in sorted(samples.items()):
+        if name == "graph_step_seconds_count" and count:
+            total = samples[("graph_step_seconds_sum", labels)]
+            step = labels.split('"')[1]
+            print(f"{step:45s} {int(count):6d} {total / count * 1000:8.1f}")
+    for (name, labels), value in sorted(samples.items()):
+        if name in ("llm_tokens_total", "cache_lookups_total"):
+            print(f"{name}{{{labels}}} {value:g}")
+
+
+async def run(args):
+    from benchmarks import fakes
+
+    configure_environment(args)
+    fakes.install(args.llm_latency, args.search_latency, args.yes_rate)
+    if args.fake_embeddings:
+        fakes.use_fake_embeddings()
+
+    import httpx
+    from Api.main import app, warm_retrieval
+
+    warm_retrieval()
+    questions = load_questions(args.questions)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 timeout=args.timeout) as client:
+        users = await setup_users(client, args.users)
+        print(f"{args.users} users, {len(questions)} questions, {args.rps} req/s for {args.duration}s")
+        results, wall_seconds, max_lag = await drive(
+            client, users, questions, args.rps, args.duration, args.login_ratio, args.seed
+        )
+        metrics_text = (await client.get("/metrics")).text
+    report(results, wall_seconds, max_lag, metrics_text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_api")
+    parser.add_argument("--rps", type=float, default=5.0, help="requests started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--login-ratio", type=float, default=0.1,
+                        help="share of requests that are /login instead of /chat")
+    parser.add_argument("--questions", default=None, help='JSONL of {"question": ...}')
+    parser.add_argument("--database-url", default=None,
+                        help="SQLAlchemy URL; defaults to a fresh SQLite file")
+    parser.add_argument("--llm-latency", default="lognormal:400:0.4")
+    parser.add_argument("--search-latency", default="lognormal:700:0.5")
+    parser.add_argument("--yes-rate", type=float, default=0.85,
+                        help="probability a fake grader answers yes")
+    parser.add_argument("--no-caches", action="store_true",
+                        help="disable the semantic answer, LLM response and web search caches")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="hashed vectors instead of the sentence-transformers model")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmarks for the hot local steps of a question: loading the index
+(in each on-disk format), the `retrieve` node and the `route_question` edge.
+LLM and search calls go to zero-latency fakes, so only local work is timed.
+
+    python -m benchmarks.micro [--repeat 20] [--fake-embeddings]
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import fakes
+
+
+def measure(func, inputs, repeat=1):
+    """Per-call milliseconds of `func` over `inputs`, `repeat` times each."""
+    timings = []
+    for _ in range(repeat):
+        for value in inputs:
+            start = time.perf_counter()
+            func(value)
+            timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)
+
+
+def print_row(name, timings):
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(f"{name:34s} {len(timings):6d} {statistics.mean(timings):9.3f}"
+          f" {timings[len(timings) // 2]:9.3f} {p95:9.3f}")
+
+
+def bench_index_load(repeat):
+    from src.rags.rag import VECTORSTORE_PATH, get_embeddings
+    from src.rags.store import FORMATS, load_vectorstore, save_vectorstore
+
+    embeddings = get_embeddings()
+    source = load_vectorstore(VECTORSTORE_PATH, embeddings, writable=True)
+    query = embeddings.embed_query("Sunmarke School fees")
+    workdir = Path(tempfile.mkdtemp(prefix="sunmarke-micro-"))
+    try:
+        for fmt in FORMATS:
+            path = workdir / fmt
+            save_vectorstore(source, path, fmt)
+            print_row(f"index load ({fmt})",
+                      measure(lambda p: load_vectorstore(p, embeddings), [path], repeat))
+            # A mapped index pays for page faults and docstore reads on first search
+            print_row(f"load + first search ({fmt})", measure(
+                lambda p: load_vectorstore(p, embeddings).similarity_search_by_vector(query, k=4),
+                [path], repeat,
+            ))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="hashed vectors instead of the sentence-transformers model")
+    args = parser.parse_args(argv)
+
+    fakes.install(llm_latency="fixed:0", search_latency="fixed:0")
+    if args.fake_embeddings:
+        fakes.use_fake_embeddings()
+
+    from benchmarks.retrieval_eval import synthetic_questions
+    from src.Edges.Edge import route_question
+    from src.nodes.Node import retrieve
+    from src.rags.rag import get_embeddings, warm_vectorstore
+
+    questions = [q["question"] for q in synthetic_questions()]
+    warm_vectorstore()
+
+    print(f"{'operation':34s} {'calls':>6s} {'mean ms':>9s} {'p50 ms':>9s} {'p95 ms':>9s}")
+    bench_index_load(args.repeat)
+    print_row("embed query", measure(get_embeddings().embed_query, questions))
+    print_row("retrieve node", measure(lambda q: retrieve({"question": q}), questions))
+    print_row("route_question edge", measure(lambda q: route_question({"question": q}), questions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Offline retrieval eval: recall@k against latency over school_data.json.
+
+Each record yields questions built from its section and subsection titles
+(or pass --questions with a JSONL file of {"question": ..., "record_id": ...}).
+A question counts as recalled when any retrieved chunk comes from its record.
+
+--calibrate instead checks the reranker thresholds (src/rags/rerank.py)
+against the LLM retrieval grader they stand in for. Each question's top
+--calibrate-k chunks are labelled by the grader (or labels are read from
+--pairs, a JSONL file of {"question", "document", "relevant"}), and each
+scorer reports how often its confident accepts and rejects agree with the
+labels, plus the loosest thresholds reaching --target precision. Labelling
+calls the configured Groq model, so it needs GROQ_API_KEY.
+
+    python -m benchmarks.retrieval_eval [--questions FILE] [--k 1 2 4 8]
+    python -m benchmarks.retrieval_eval --calibrate [--pairs FILE] [--target 0.95]
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.rags.rag import BASE_DIR, get_vectorstore, make_retriever
+
+QUESTION_TEMPLATES = [
+    "Tell me about {subsection}",
+    "What does Sunmarke offer for {subsection} in {section}?",
+]
+
+
+def synthetic_questions(path=BASE_DIR / "school_data.json"):
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    questions = []
+    for record in records:
+        subsection = record.get("subsection", "")
+        if not subsection or subsection == "Main":
+            subsection = record.get("section", "")
+        for template in QUESTION_TEMPLATES:
+            questions.append({
+                "question": template.format(subsection=subsection, section=record.get("section", "")),
+                "record_id": record.get("id"),
+            })
+    return questions
+
+
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(retriever, questions):
+    hits, latencies, returned = 0, [], []
+    for item in questions:
+        start = time.perf_counter()
+        docs = retriever.invoke(item["question"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        returned.append(len(docs))
+        if any(d.metadata.get("id") == item["record_id"] for d in docs):
+            hits += 1
+    latencies.sort()
+    return {
+        "recall": hits / len(questions),
+        "docs": statistics.mean(returned),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def configurations(ks):
+    for k in ks:
+        yield f"similarity k={k}", {"mode": "dense", "search_type": "similarity", "k": k}
+    for k in ks:
+        yield f"mmr k={k} fetch_k={4 * k}", {"mode": "dense", "search_type": "mmr", "k": k, "fetch_k": 4 * k}
+    for threshold in (0.2, 0.3, 0.4):
+        yield (
+            f"threshold>={threshold} k={max(ks)}",
+            {"mode": "dense", "search_type": "similarity_score_threshold", "k": max(ks),
+             "score_threshold": threshold},
+        )
+    for k in ks:
+        yield f"hybrid bm25+dense k={k}", {"mode": "hybrid", "k": k}
+
+
+def grader_pairs(retriever, questions):
+    """(question, document, relevant) for every retrieved chunk, labelled by the LLM grader."""
+    from src.route.Grade import get_retrieval_grader
+
+    grader = get_retrieval_grader()
+    pairs = []
+    for item in questions:
+        for doc in retriever.invoke(item["question"]):
+            verdict = grader.invoke({"question": item["question"], "document": doc.page_content})
+            pairs.append({"question": item["question"], "document": doc.page_content,
+                          "relevant": verdict.binary_score == "yes"})
+    return pairs
+
+
+def threshold_precision(scores, labels, accept, reject):
+    """Precision and coverage of the confident verdicts at the given thresholds."""
+    accepted, rejected = scores >= accept, scores < reject
+    return {
+        "accept_precision": labels[accepted].mean() if accepted.any() else float("nan"),
+        "accept_share": accepted.mean(),
+        "reject_precision": (~labels[rejected]).mean() if rejected.any() else float("nan"),
+        "reject_share": rejected.mean(),
+    }
+
+
+def loosest_thresholds(scores, labels, target):
+    """
+    Lowest accept and highest reject threshold whose verdicts reach `target`
+    precision; None when no threshold does.
+    """
+    accept = reject = None
+    for t in np.unique(scores)[::-1]:
+        if labels[scores >= t].mean() < target:
+            break
+        accept = float(t)
+    for t in np.unique(scores):
+        rejected = scores < t
+        if rejected.any() and (~labels[rejected]).mean() < target:
+            break
+        reject = float(t)
+    return accept, reject
+
+
+def calibrate(pairs, target):
+    from src.rags.rerank import CrossEncoderScorer, LexicalScorer
+
+    labels = np.asarray([p["relevant"] for p in pairs], dtype=bool)
+    print(f"{len(pairs)} labelled pairs, {labels.mean():.1%} relevant")
+    scorers = [("lexical", LexicalScorer), ("cross-encoder", CrossEncoderScorer)]
+
+    print(f"{'scorer':24s} {'accept':>7s} {'reject':>7s} {'acc prec':>9s} {'acc %':>6s}"
+          f" {'rej prec':>9s} {'rej %':>6s}")
+    for name, cls in scorers:
+        try:
+            scorer = cls()
+        except Exception as e:
+            print(f"{name:24s} unavailable: {e}")
+            continue
+        scores = np.concatenate([
+            scorer.score(p["question"], [p["document"]]) for p in pairs
+        ])
+        accept, reject = loosest_thresholds(scores, labels, target)
+        rows = [("default", cls.accept, cls.reject)]
+        if accept is not None and reject is not None:
+            rows.append((f"{target:.0%} prec", accept, reject))
+        for label, a, r in rows:
+            result = threshold_precision(scores, labels, a, r)
+            print(
+                f"{name + ' ' + label:24s} {a:7.3f} {r:7.3f} {result['accept_precision']:9.3f}"
+                f" {result['accept_share']:6.1%} {result['reject_precision']:9.3f}"
+                f" {result['reject_share']:6.1%}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.retrieval_eval")
+    parser.add_argument("--questions", type=Path, default=None)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--calibrate", action="store_true",
+                        help="check reranker thresholds against the LLM grader")
+    parser.add_argument("--pairs", type=Path, default=None,
+                        help="labelled pairs for --calibrate instead of grading retrievals")
+    parser.add_argument("--calibrate-k", type=int, default=4)
+    parser.add_argument("--target", type=float, default=0.95,
+                        help="precision the suggested thresholds must reach")
+    args = parser.parse_args(argv)
+
+    if args.calibrate and args.pairs:
+        calibrate(load_questions(args.pairs), args.target)
+        return
+
+    questions = load_questions(args.questions) if args.questions else synthetic_questions()
+    vectorstore, retriever = get_vectorstore()
+    if args.calibrate:
+        calibrate(grader_pairs(make_retriever(vectorstore, k=args.calibrate_k), questions),
+                  args.target)
+        return
+    retriever.invoke("warm up")
+
+    print(f"{len(questions)} questions")
+    print(f"{'configuration':32s} {'recall':>7s} {'docs':>5s} {'p50 ms':>7s} {'p95 ms':>7s}")
+    for name, kwargs in configurations(args.k):
+        result = evaluate(make_retriever(vectorstore, **kwargs), questions)
+        print(
+            f"{name:32s} {result['recall']:7.3f} {result['docs']:5.1f}"
+            f" {result['p50_ms']:7.2f} {result['p95_ms']:7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
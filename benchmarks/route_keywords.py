@@ -0,0 +1,117 @@
+"""
+Micro-benchmark for the router keyword heuristics.
+
+Compares the compiled matcher in src/route/keywords.py with the original
+substring scan from route_question: decision agreement on a question set,
+time per question, and how both scale to a few hundred keywords.
+
+    python -m benchmarks.route_keywords
+"""
+import json
+import random
+import string
+import timeit
+from pathlib import Path
+
+from src.route.keywords import RouteKeywords, ROUTER_KEYWORDS_PATH
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def legacy_route(question):
+    """The substring heuristics route_question used before the compiled matcher."""
+    ql = question.lower()
+    stripped = ql.strip()
+    school_keywords = [
+        "sunmark", "sunmarke", "school", "admission", "fees", "principal",
+        "campus", "curriculum", "ib", "a-level", "a level", "btec"
+    ]
+    web_lookup_keywords = [
+        "today", "latest", "current", "news", "weather", "stock", "price",
+        "recent", "update", "headline"
+    ]
+    casual_keywords = [
+        "hi", "hello", "hey", "how are you", "who are you", "thank you",
+        "thanks", "good morning", "good evening", "what can you do"
+    ]
+    casual_exact = {"hi", "hello", "hey", "yo", "sup", "thanks", "thank you"}
+
+    if stripped in casual_exact or any(k in ql for k in casual_keywords):
+        return "chat"
+    if any(k in ql for k in school_keywords):
+        return "vectorstore"
+    if any(k in ql for k in web_lookup_keywords):
+        return "web_search"
+    return None
+
+
+def load_questions():
+    questions = []
+    with open(ROOT / "src" / "route" / "router_exemplars.json", encoding="utf-8") as f:
+        for examples in json.load(f).values():
+            questions.extend(examples)
+    with open(ROOT / "src" / "rags" / "school_data.json", encoding="utf-8") as f:
+        for record in json.load(f):
+            questions.append(f"Tell me about {record['subsection']} in {record['section']}")
+    # Known substring false positives of the legacy matcher
+    questions += [
+        "Which subjects are taught in this term?",
+        "Is the library open on weekends?",
+        "What did the teacher say about homework?",
+        "Where can I find the email for the office?",
+        "Is there a shuttle available for the trip?",
+        "What is the history of the UAE?",
+    ]
+    return questions
+
+
+def compare(matcher, questions):
+    disagreements = []
+    for q in questions:
+        old = legacy_route(q)
+        new, keyword = matcher.match(q)
+        if old != new:
+            disagreements.append((q, old, new, keyword))
+    return disagreements
+
+
+def time_per_call(fn, questions, repeat=5):
+    number = 200
+    best = min(timeit.repeat(lambda: [fn(q) for q in questions], number=number, repeat=repeat))
+    return best / (number * len(questions)) * 1e6
+
+
+def synthetic_keywords(n, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(n)]
+
+
+def main():
+    matcher = RouteKeywords.from_file(ROUTER_KEYWORDS_PATH)
+    questions = load_questions()
+
+    disagreements = compare(matcher, questions)
+    print(f"Questions: {len(questions)}, decisions changed: {len(disagreements)}")
+    for q, old, new, keyword in disagreements:
+        print(f"  {q!r}: {old} -> {new}" + (f" (matched {keyword!r})" if keyword else ""))
+
+    print(f"\nlegacy substring scan: {time_per_call(legacy_route, questions):.2f} us/question")
+    print(f"compiled matcher:      {time_per_call(matcher.match, questions):.2f} us/question")
+
+    print("\nScaling with keyword count (single route, no match):")
+    for n in (10, 100, 500, 1000):
+        keywords = synthetic_keywords(n)
+        scaled = RouteKeywords([{"route": "vectorstore", "keywords": keywords}])
+        lowered = [q.lower() for q in questions]
+
+        def substring(q, keywords=keywords):
+            return any(k in q for k in keywords)
+
+        print(
+            f"  {n:5d} keywords: substring {time_per_call(substring, lowered, repeat=3):8.2f} us,"
+            f" compiled {time_per_call(scaled.match, questions, repeat=3):6.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
+import logging
+
 from src.graphs.graph import app
 
 if __name__ == "__main__":
+    # Show the graph's step-by-step debug log
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
+    logging.getLogger("src").setLevel(logging.DEBUG)
+
     # Example question
     question = "Tell me about the sunmark school?"
 
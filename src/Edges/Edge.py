@@ -1,7 +1,79 @@
 ### Edges ###
-from src.route.route import question_router
-from src.route.GradeHallucination import hallucination_grader
-from src.route.GradeAnswer import answer_grader
+import asyncio
+import logging
+import os
+from functools import lru_cache
+
+from langchain_core.runnables import RunnableParallel
+
+from src.route.route import get_question_router
+from src.route.GradeHallucination import get_hallucination_grader
+from src.route.GradeAnswer import get_answer_grader
+from src.route.keywords import RouteKeywords
+
+logger = logging.getLogger(__name__)
+
+# How generations are graded: "sequential", "parallel" or "combined"
+GENERATION_GRADING_MODE = os.getenv("GENERATION_GRADING_MODE", "sequential").lower()
+
+# Router for prompts the keyword heuristics miss: "local" tries the embedding
+# router first and only asks the LLM below ROUTER_MIN_MARGIN; "llm" always asks
+ROUTER_MODE = os.getenv("ROUTER_MODE", "local").lower()
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.05"))
+
+# Heuristic keyword routes, compiled once (see src/route/router_keywords.json)
+ROUTE_KEYWORDS = RouteKeywords.from_file()
+
+
+_HEURISTIC_LABELS = {
+    "chat": "CHAT",
+    "vectorstore": "RAG (vectorstore)",
+    "web_search": "WEB SEARCH",
+}
+
+
+def _route_heuristic(question):
+    """Keyword short-circuit for simple prompts; returns None when undecided."""
+    route, _ = ROUTE_KEYWORDS.match(question)
+    if route:
+        logger.debug("---ROUTER HEURISTIC: choosing %s---", _HEURISTIC_LABELS.get(route, route))
+    return route
+
+
+def _route_local(question):
+    """Embedding router decision, or None when it is not confident enough."""
+    if ROUTER_MODE != "local":
+        return None
+    from src.route.embedroute import get_embedding_router
+
+    try:
+        label, margin = get_embedding_router().classify(question)
+    except Exception as e:
+        logger.warning("Local router failed, falling back to LLM router: %s", e)
+        return None
+
+    if margin < ROUTER_MIN_MARGIN:
+        logger.debug("---ROUTER LOCAL: low confidence for %s (margin %.3f), asking LLM---",
+                     label, margin)
+        return None
+    logger.debug("---ROUTER LOCAL: choosing %s (margin %.3f)---", label, margin)
+    return label
+
+
+def _route_from_datasource(ds):
+    """Map the LLM router's datasource onto a graph branch."""
+    if ds in ("web_search", "websearch", "web-search"):
+        logger.debug("---ROUTE QUESTION TO WEB SEARCH---")
+        return "web_search"
+    if ds in ("vectorstore", "vector_store", "vector-store"):
+        logger.debug("---ROUTE QUESTION TO RAG---")
+        return "vectorstore"
+    if ds in ("chat", "conversation", "normal_chat"):
+        logger.debug("---ROUTE QUESTION TO CHAT---")
+        return "chat"
+
+    logger.debug("---ROUTER DEFAULT: choosing CHAT---")
+    return "chat"
 
 
 def route_question(state):
@@ -15,56 +87,45 @@ def route_question(state):
         str: Next node to call
     """
 
-    print("---ROUTE QUESTION---")
+    logger.debug("---ROUTE QUESTION---")
     question = state["question"]
 
     # Heuristic short-circuit first for stability on simple prompts.
-    ql = question.lower()
-    stripped = ql.strip()
-    school_keywords = [
-        "sunmark", "sunmarke", "school", "admission", "fees", "principal",
-        "campus", "curriculum", "ib", "a-level", "a level", "btec"
-    ]
-    web_lookup_keywords = [
-        "today", "latest", "current", "news", "weather", "stock", "price",
-        "recent", "update", "headline"
-    ]
-    casual_keywords = [
-        "hi", "hello", "hey", "how are you", "who are you", "thank you",
-        "thanks", "good morning", "good evening", "what can you do"
-    ]
-    casual_exact = {"hi", "hello", "hey", "yo", "sup", "thanks", "thank you"}
-
-    if stripped in casual_exact or any(k in ql for k in casual_keywords):
-        print("---ROUTER HEURISTIC: choosing CHAT---")
-        return "chat"
-    if any(k in ql for k in school_keywords):
-        print("---ROUTER HEURISTIC: choosing RAG (vectorstore)---")
-        return "vectorstore"
-    if any(k in ql for k in web_lookup_keywords):
-        print("---ROUTER HEURISTIC: choosing WEB SEARCH---")
-        return "web_search"
+    route = _route_heuristic(question) or _route_local(question)
+    if route:
+        return route
 
     # Attempt to use the trained router for ambiguous prompts.
     try:
-        source = question_router.invoke({"question": question})
+        source = get_question_router().invoke({"question": question})
         ds = getattr(source, "datasource", None)
     except Exception as e:
-        print("Router failed, falling back to chat:", e)
+        logger.warning("Router failed, falling back to chat: %s", e)
         ds = None
 
-    if ds in ("web_search", "websearch", "web-search"):
-        print("---ROUTE QUESTION TO WEB SEARCH---")
-        return "web_search"
-    if ds in ("vectorstore", "vector_store", "vector-store"):
-        print("---ROUTE QUESTION TO RAG---")
-        return "vectorstore"
-    if ds in ("chat", "conversation", "normal_chat"):
-        print("---ROUTE QUESTION TO CHAT---")
-        return "chat"
+    return _route_from_datasource(ds)
 
-    print("---ROUTER DEFAULT: choosing CHAT---")
-    return "chat"
+
+async def aroute_question(state):
+    """Async variant of `route_question`."""
+    logger.debug("---ROUTE QUESTION---")
+    question = state["question"]
+
+    route = _route_heuristic(question)
+    if not route and ROUTER_MODE == "local":
+        # Embedding the question is CPU work; keep it off the event loop
+        route = await asyncio.to_thread(_route_local, question)
+    if route:
+        return route
+
+    try:
+        source = await get_question_router().ainvoke({"question": question})
+        ds = getattr(source, "datasource", None)
+    except Exception as e:
+        logger.warning("Router failed, falling back to chat: %s", e)
+        ds = None
+
+    return _route_from_datasource(ds)
 
 
 def decide_to_generate(state):
@@ -78,27 +139,51 @@ def decide_to_generate(state):
         str: Binary decision for next node to call
     """
 
-    print("---ASSESS GRADED DOCUMENTS---")
+    logger.debug("---ASSESS GRADED DOCUMENTS---")
     state["question"]
     filtered_documents = state["documents"]
 
     if not filtered_documents:
         # All documents have been filtered check_relevance
         # We will re-generate a new query
-        print(
+        logger.debug(
             "---DECISION: ALL DOCUMENTS ARE NOT RELEVANT TO QUESTION, TRANSFORM QUERY---"
         )
         return "transform_query"
     else:
         # We have relevant documents, so generate answer
-        print("---DECISION: GENERATE---")
+        logger.debug("---DECISION: GENERATE---")
         return "generate"
 
 
+def _generation_outcome(grounded, addresses_question, log_grounded=True):
+    """Map grader verdicts onto the edges leaving `generate`."""
+    if not grounded:
+        logger.debug("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
+        return "not supported"
+    if log_grounded:
+        logger.debug("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+    if addresses_question:
+        logger.debug("---DECISION: GENERATION ADDRESSES QUESTION---")
+        return "useful"
+    logger.debug("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
+    return "not useful"
+
+
+@lru_cache(maxsize=1)
+def _parallel_graders():
+    """Both graders fed the same input and run concurrently."""
+    return RunnableParallel(grounded=get_hallucination_grader(), answer=get_answer_grader())
+
+
 def grade_generation_v_documents_and_question(state):
     """
     Determines whether the generation is grounded in the document and answers question.
 
+    GENERATION_GRADING_MODE selects how: "sequential" calls the hallucination
+    grader then the answer grader, "parallel" runs both at once and
+    "combined" asks a single grader for both verdicts.
+
     Args:
         state (dict): The current graph state
 
@@ -106,29 +191,58 @@ def grade_generation_v_documents_and_question(state):
         str: Decision for next node to call
     """
 
-    print("---CHECK HALLUCINATIONS---")
-    question = state["question"]
-    documents = state["documents"]
-    generation = state["generation"]
-
-    score = hallucination_grader.invoke(
-        {"documents": documents, "generation": generation}
-    )
-    grade = score.binary_score
-
-    # Check hallucination
-    if grade == "yes":
-        print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
-        # Check question-answering
-        print("---GRADE GENERATION vs QUESTION---")
-        score = answer_grader.invoke({"question": question, "generation": generation})
-        grade = score.binary_score
-        if grade == "yes":
-            print("---DECISION: GENERATION ADDRESSES QUESTION---")
-            return "useful"
-        else:
-            print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
-            return "not useful"
-    else:
-        print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
-        return "not supported"
+    logger.debug("---CHECK HALLUCINATIONS---")
+    grader_input = {
+        "question": state["question"],
+        "documents": state["documents"],
+        "generation": state["generation"],
+    }
+
+    if GENERATION_GRADING_MODE == "combined":
+        from src.route.GradeGeneration import get_generation_grader
+        score = get_generation_grader().invoke(grader_input)
+        return _generation_outcome(score.grounded == "yes", score.addresses_question == "yes")
+
+    if GENERATION_GRADING_MODE == "parallel":
+        scores = _parallel_graders().invoke(grader_input)
+        return _generation_outcome(
+            scores["grounded"].binary_score == "yes", scores["answer"].binary_score == "yes"
+        )
+
+    score = get_hallucination_grader().invoke(grader_input)
+    if score.binary_score != "yes":
+        return _generation_outcome(False, False)
+    logger.debug("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+    # Check question-answering
+    logger.debug("---GRADE GENERATION vs QUESTION---")
+    score = get_answer_grader().invoke(grader_input)
+    return _generation_outcome(True, score.binary_score == "yes", log_grounded=False)
+
+
+async def agrade_generation_v_documents_and_question(state):
+    """Async variant of `grade_generation_v_documents_and_question`."""
+    logger.debug("---CHECK HALLUCINATIONS---")
+    grader_input = {
+        "question": state["question"],
+        "documents": state["documents"],
+        "generation": state["generation"],
+    }
+
+    if GENERATION_GRADING_MODE == "combined":
+        from src.route.GradeGeneration import get_generation_grader
+        score = await get_generation_grader().ainvoke(grader_input)
+        return _generation_outcome(score.grounded == "yes", score.addresses_question == "yes")
+
+    if GENERATION_GRADING_MODE == "parallel":
+        scores = await _parallel_graders().ainvoke(grader_input)
+        return _generation_outcome(
+            scores["grounded"].binary_score == "yes", scores["answer"].binary_score == "yes"
+        )
+
+    score = await get_hallucination_grader().ainvoke(grader_input)
+    if score.binary_score != "yes":
+        return _generation_outcome(False, False)
+    logger.debug("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+    logger.debug("---GRADE GENERATION vs QUESTION---")
+    score = await get_answer_grader().ainvoke(grader_input)
+    return _generation_outcome(True, score.binary_score == "yes", log_grounded=False)
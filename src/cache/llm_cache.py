@@ -0,0 +1,244 @@
+## Exact-match response cache for deterministic LLM chains
+# Grader, router and rewriter chains are re-issued with identical inputs when
+# the graph loops and across users; this layer answers repeats locally.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+from langchain_core.runnables import Runnable
+
+from src.observability.tracing import record_cache_lookup
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory").lower()  # memory, sqlite or off
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "4096"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_PATH = Path(os.getenv(
+    "LLM_CACHE_PATH",
+    Path(__file__).resolve().parent / "llm_cache.sqlite3",
+))
+
+
+class MemoryBackend:
+    """In-process LRU cache with a TTL."""
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl > 0 and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """
+    Local on-disk cache, shared by every worker process on the host and kept
+    across restarts. Least recently used rows are pruned past `max_entries`.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)"
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl > 0 and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, stored_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+@lru_cache(maxsize=1)
+def get_cache_backend():
+    """Return the configured process-wide backend, or None when caching is off."""
+    if LLM_CACHE_BACKEND == "sqlite":
+        return SQLiteBackend()
+    if LLM_CACHE_BACKEND == "memory":
+        return MemoryBackend()
+    return None
+
+
+# Per-chain hit/miss counters
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+_stats_lock = threading.Lock()
+
+
+def _record(name, hit):
+    with _stats_lock:
+        _stats[name]["hits" if hit else "misses"] += 1
+    record_cache_lookup(f"llm:{name}", hit)
+
+
+def cache_stats():
+    """Per-chain hit/miss counts and hit rates."""
+    with _stats_lock:
+        return {
+            name: {**counts, "hit_rate": counts["hits"] / max(1, counts["hits"] + counts["misses"])}
+            for name, counts in _stats.items()
+        }
+
+
+def _normalize(value):
+    """Reduce prompt inputs to a canonical, JSON-serializable form."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if hasattr(value, "page_content"):
+        return _normalize(value.page_content)
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return _normalize(str(value))
+
+
+class CachedRunnable(Runnable):
+    """
+    Wrap a chain so identical (chain name, model, normalized inputs) calls are
+    answered from the response cache.
+
+    Args:
+        name (str): Chain name, used in the cache key and the metrics
+        runnable (Runnable): The chain to wrap
+        model (str): Model identifier, so a model change never serves stale entries
+        schema (type[BaseModel] | None): Structured output model; None for string outputs
+        backend: Cache backend; defaults to the configured process-wide one
+    """
+
+    def __init__(self, name, runnable, model, schema=None, backend=None):
+        self.name = name
+        self.runnable = runnable
+        self.model = model
+        self.schema = schema
+        self.backend = backend
+        # Prompt variables of the wrapped chain; other input keys never affect the output
+        try:
+            self._input_keys = set(runnable.get_input_schema().model_fields)
+        except Exception:
+            self._input_keys = None
+
+    @property
+    def InputType(self):
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self):
+        return self.runnable.OutputType
+
+    def _backend(self):
+        return self.backend if self.backend is not None else get_cache_backend()
+
+    def _key(self, input):
+        keys = self._input_keys
+        if keys and isinstance(input, dict):
+            input = {k: v for k, v in input.items() if k in keys}
+        payload = json.dumps([self.name, self.model, _normalize(input)], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _encode(self, output):
+        if self.schema is not None:
+            return output.model_dump_json()
+        return json.dumps(output)
+
+    def _decode(self, value):
+        if self.schema is not None:
+            return self.schema.model_validate_json(value)
+        return json.loads(value)
+
+    def _lookup(self, backend, key):
+        value = backend.get(key)
+        _record(self.name, value is not None)
+        return None if value is None else self._decode(value)
+
+    def invoke(self, input, config=None, **kwargs):
+        backend = self._backend()
+        if backend is None:
+            return self.runnable.invoke(input, config, **kwargs)
+        key = self._key(input)
+        cached = self._lookup(backend, key)
+        if cached is not None:
+            return cached
+        output = self.runnable.invoke(input, config, **kwargs)
+        backend.set(key, self._encode(output))
+        return output
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        backend = self._backend()
+        if backend is None:
+            return await self.runnable.ainvoke(input, config, **kwargs)
+        key = self._key(input)
+        cached = self._lookup(backend, key)
+        if cached is not None:
+            return cached
+        output = await self.runnable.ainvoke(input, config, **kwargs)
+        backend.set(key, self._encode(output))
+        return output
+
+
+def cached_chain(name, runnable, schema=None):
+    """Wrap `runnable` in the response cache for the shared Groq model."""
+    from src.llms.llm import MODEL_NAME
+    return CachedRunnable(name, runnable, MODEL_NAME, schema=schema)
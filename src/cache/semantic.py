@@ -0,0 +1,154 @@
+## Semantic answer cache
+# Returns a previously graded answer when a new question is a near-duplicate
+# of one already answered, so repeat FAQs skip the whole graph.
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from src.observability.tracing import record_cache_lookup
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+
+
+def _normalize(question):
+    return " ".join(question.lower().split())
+
+
+class SemanticCache:
+    """
+    In-process cache of graded answers keyed on question embeddings.
+
+    Entries live in an LRU ordered dict; similarity search runs as one
+    matrix-vector product over the (normalized) cached embeddings, which is
+    well under a millisecond at the configured sizes. The cache is cleared
+    whenever a different school vectorstore is installed.
+    """
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (embedding, generation, stored_at)
+        self._matrix = None
+        self._keys = None
+        self._index_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _embed(self, text):
+        from src.rags.rag import get_embeddings
+        embedding = np.asarray(get_embeddings().embed_query(text), dtype=np.float32)
+        # Unit length, so the dot products in `_search` are cosine similarities
+        # whatever the embedding model's own normalization
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def _check_index_version(self):
+        from src.rags.rag import get_index_version
+        version = get_index_version()
+        if version != self._index_version:
+            self._entries.clear()
+            self._matrix = None
+            self._index_version = version
+
+    def _expired(self, stored_at, now):
+        return self.ttl > 0 and now - stored_at > self.ttl
+
+    def _search(self, embedding):
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[k][0] for k in self._keys])
+        scores = self._matrix @ embedding
+        best = int(np.argmax(scores))
+        return self._keys[best], float(scores[best])
+
+    def lookup(self, question):
+        """
+        Return the cached answer for a near-duplicate question, or None.
+
+        Args:
+            question (str): The incoming user question
+
+        Returns:
+            str | None: The cached generation on a hit
+        """
+        answer = self._lookup(question)
+        record_cache_lookup("semantic", answer is not None)
+        return answer
+
+    def _lookup(self, question):
+        key = _normalize(question)
+        now = time.monotonic()
+        with self._lock:
+            self._check_index_version()
+            empty = not self._entries
+            exact = key in self._entries
+        if empty:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Embed outside the lock; an exact repeat skips the model entirely
+        embedding = None if exact else self._embed(key)
+
+        with self._lock:
+            if embedding is not None and self._entries:
+                match, score = self._search(embedding)
+                key = match if score >= self.threshold else None
+            entry = self._entries.get(key) if key is not None else None
+            if entry is not None and self._expired(entry[2], now):
+                del self._entries[key]
+                self._matrix = None
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def store(self, question, generation):
+        """Cache a graded answer for a question."""
+        key = _normalize(question)
+        embedding = self._embed(key)
+        with self._lock:
+            self._check_index_version()
+            self._entries[key] = (embedding, generation, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self):
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache():
+    """Return the process-wide semantic cache, or None when disabled."""
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    return SemanticCache()
@@ -0,0 +1,193 @@
+"""
+Answer many questions through the graph with bounded concurrency.
+
+Results are written as JSON lines as soon as each question finishes, with
+the wall time spent in every graph node. Questions share the process-wide
+vectorstore, LLM caches and semantic answer cache. Re-running with the same
+output file skips the questions already answered, so an interrupted sweep
+resumes where it stopped.
+
+    python -m src.graphs.batch questions.jsonl -o results.jsonl [--concurrency 8]
+
+Each input line is {"id": ..., "question": ...}; `id` defaults to the line number.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableLambda
+
+from src.graphs.graph import aanswer_question
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_RECURSION_LIMIT = 12
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Accumulate wall time per graph node; nodes revisited by a loop add up."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.graph_run_id = None
+        self.started = {}
+        self.timings = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None,
+                       metadata=None, **kwargs):
+        if parent_run_id is None:
+            self.graph_run_id = run_id
+            return
+        # Node runs are the direct children of the graph run
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and parent_run_id == self.graph_run_id:
+            self.started[run_id] = (node, time.perf_counter())
+
+    def _finish(self, run_id):
+        node, start = self.started.pop(run_id, (None, None))
+        if node is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[node] = round(self.timings.get(node, 0.0) + elapsed, 1)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+async def _answer_record(item):
+    """Answer one {"id", "question"} item; errors are reported, not raised."""
+    timer = NodeTimer()
+    start = time.perf_counter()
+    record = {"id": item["id"], "question": item["question"]}
+    try:
+        final_state = await aanswer_question(
+            item["question"],
+            config={"recursion_limit": BATCH_RECURSION_LIMIT, "callbacks": [timer]},
+        )
+        record["answer"] = final_state.get("generation")
+        record["datasource"] = final_state.get("datasource")
+        record["cached"] = bool(final_state.get("cached"))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    record["nodes"] = timer.timings
+    return record
+
+
+_answer_runnable = RunnableLambda(_answer_record, name="batch_answer")
+
+
+async def run_batch(items, max_concurrency=BATCH_CONCURRENCY):
+    """
+    Answer `items` concurrently, yielding result records in completion order.
+
+    Args:
+        items (list): dicts with "id" and "question"
+        max_concurrency (int): Questions in flight at once
+
+    Yields:
+        dict: id, question, answer (or error), datasource, cached, seconds and
+        per-node milliseconds
+    """
+    async for _, record in _answer_runnable.abatch_as_completed(
+        items, config={"max_concurrency": max_concurrency}
+    ):
+        yield record
+
+
+def load_items(path):
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            item.setdefault("id", line_number)
+            items.append(item)
+    return items
+
+
+def completed_ids(path, retry_errors=False):
+    """Ids already answered in an existing results file."""
+    done = set()
+    if not Path(path).exists():
+        return done
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interruption, possibly mid-character;
+                # that question runs again
+                continue
+            if retry_errors and "error" in record:
+                continue
+            done.add(json.dumps(record["id"]))
+    return done
+
+
+def drop_partial_record(path):
+    """Cut off a last record left unfinished by an interruption."""
+    if not Path(path).exists():
+        return
+    # Binary, since the cut may fall inside a multi-byte character
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Scan back to the end of the last complete line
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+
+
+async def run_file(source, output, max_concurrency=BATCH_CONCURRENCY, retry_errors=False):
+    items = load_items(source)
+    done = completed_ids(output, retry_errors)
+    todo = [item for item in items if json.dumps(item["id"]) not in done]
+    print(f"{len(items)} questions, {len(items) - len(todo)} already answered, {len(todo)} to run")
+
+    answered = failed = 0
+    start = time.perf_counter()
+    drop_partial_record(output)
+    with open(output, "a", encoding="utf-8") as f:
+        async for record in run_batch(todo, max_concurrency):
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            answered += 1
+            failed += "error" in record
+    elapsed = time.perf_counter() - start
+    print(f"✓ {answered} answered ({failed} errors) in {elapsed:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.graphs.batch")
+    parser.add_argument("source", type=Path, help="JSONL file of questions")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL results, appended")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="run again the questions that failed last time")
+    args = parser.parse_args(argv)
+    asyncio.run(run_file(args.source, args.output, args.concurrency, args.retry_errors))
+
+
+if __name__ == "__main__":
+    main()
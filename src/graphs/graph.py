@@ -1,24 +1,46 @@
+import asyncio
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph, START
 
+from src.observability.tracing import instrument, trace_request
 from src.states.state import GraphState
 
-from src.nodes.Node import retrieve, generate, grade_documents, transform_query, web_search, chat
-from src.Edges.Edge import route_question, decide_to_generate, grade_generation_v_documents_and_question
+from src.nodes.Node import (
+    retrieve, generate, grade_documents, transform_query, web_search, chat,
+    aretrieve, agenerate, agrade_documents, atransform_query, aweb_search, achat,
+)
+from src.Edges.Edge import (
+    route_question, decide_to_generate, grade_generation_v_documents_and_question,
+    aroute_question, agrade_generation_v_documents_and_question,
+)
+
+
+def _dual(func, afunc, kind="node"):
+    """
+    Register a sync/async pair so the graph serves both `invoke` and `ainvoke`,
+    instrumented for wall time (src/observability/tracing.py).
+    """
+    name = func.__name__
+    return RunnableLambda(
+        instrument(func, kind), afunc=instrument(afunc, kind, name), name=name
+    )
+
 
 workflow = StateGraph(GraphState)
 
 # Define the nodes
-workflow.add_node("chat", chat)  # normal conversation
-workflow.add_node("web_search", web_search)  # web search
-workflow.add_node("retrieve", retrieve)  # retrieve
-workflow.add_node("grade_documents", grade_documents)  # grade documents
-workflow.add_node("generate", generate)  # generate
-workflow.add_node("transform_query", transform_query)  # transform_query
+workflow.add_node("chat", _dual(chat, achat))  # normal conversation
+workflow.add_node("web_search", _dual(web_search, aweb_search))  # web search
+workflow.add_node("retrieve", _dual(retrieve, aretrieve))  # retrieve
+workflow.add_node("grade_documents", _dual(grade_documents, agrade_documents))  # grade documents
+workflow.add_node("generate", _dual(generate, agenerate))  # generate
+workflow.add_node("transform_query", _dual(transform_query, atransform_query))  # transform_query
 
 # Build graph
 workflow.add_conditional_edges(
     START,
-    route_question,
+    _dual(route_question, aroute_question, kind="edge"),
     {
         "chat": "chat",
         "web_search": "web_search",
@@ -30,7 +52,7 @@ workflow.add_edge("web_search", "generate")
 workflow.add_edge("retrieve", "grade_documents")
 workflow.add_conditional_edges(
     "grade_documents",
-    decide_to_generate,
+    instrument(decide_to_generate, "edge"),
     {
         "transform_query": "transform_query",
         "generate": "generate",
@@ -39,7 +61,8 @@ workflow.add_conditional_edges(
 workflow.add_edge("transform_query", "retrieve")
 workflow.add_conditional_edges(
     "generate",
-    grade_generation_v_documents_and_question,
+    _dual(grade_generation_v_documents_and_question,
+          agrade_generation_v_documents_and_question, kind="edge"),
     {
         "not supported": "generate",
         "useful": END,
@@ -50,3 +73,76 @@ workflow.add_conditional_edges(
 # Compile
 app = workflow.compile()
 
+
+def is_cacheable(final_state):
+    """
+    Only graded answers grounded in the school vectorstore are reused. Answers
+    carrying a web search section are not, since web results go stale long
+    before the semantic cache TTL.
+    """
+    return (final_state.get("datasource") == "vectorstore"
+            and bool(final_state.get("generation"))
+            and not final_state.get("augmentation"))
+
+
+def graph_input(question, history=None):
+    """Initial graph state for a question and its conversation history."""
+    return {"question": question, "history": history or []}
+
+
+def answer_question(question, config=None, history=None):
+    """
+    Answer a question, consulting the semantic answer cache before the graph.
+    A follow-up (with `history`) is first rewritten into a stand-alone
+    question, which is what the cache is keyed on and the graph routes,
+    retrieves and grades with; `history` still reaches the answer prompt.
+
+    Args:
+        question (str): The user question
+        config (dict): Optional runnable config passed to the graph
+        history (list): Earlier conversation (see src/memory/conversation.py)
+
+    Returns:
+        dict: The final graph state; `question` is the stand-alone question,
+        `cached` is True when served from cache and `trace_id` identifies the
+        request in logs
+    """
+    from src.cache.semantic import get_semantic_cache
+    from src.memory.conversation import condense_question
+
+    with trace_request() as trace:
+        question = condense_question(question, history)
+        cache = get_semantic_cache()
+        if cache is not None:
+            cached = cache.lookup(question)
+            if cached is not None:
+                trace.datasource = "cache"
+                return {"question": question, "generation": cached, "documents": [],
+                        "cached": True, "trace_id": trace.trace_id}
+
+        final_state = app.invoke(graph_input(question, history), config=config)
+        if cache is not None and is_cacheable(final_state):
+            cache.store(question, final_state["generation"])
+        return {**final_state, "trace_id": trace.trace_id}
+
+
+async def aanswer_question(question, config=None, history=None):
+    """Async variant of `answer_question`."""
+    from src.cache.semantic import get_semantic_cache
+    from src.memory.conversation import acondense_question
+
+    with trace_request() as trace:
+        question = await acondense_question(question, history)
+        cache = get_semantic_cache()
+        if cache is not None:
+            # Embedding the question is CPU work; keep it off the event loop
+            cached = await asyncio.to_thread(cache.lookup, question)
+            if cached is not None:
+                trace.datasource = "cache"
+                return {"question": question, "generation": cached, "documents": [],
+                        "cached": True, "trace_id": trace.trace_id}
+
+        final_state = await app.ainvoke(graph_input(question, history), config=config)
+        if cache is not None and is_cacheable(final_state):
+            await asyncio.to_thread(cache.store, question, final_state["generation"])
+        return {**final_state, "trace_id": trace.trace_id}
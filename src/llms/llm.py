@@ -1,10 +1,20 @@
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+
+MODEL_NAME = "openai/gpt-oss-120b"
+
+
+@lru_cache(maxsize=1)
+def load_env():
+    """Load the .env file into the environment, once per process."""
+    load_dotenv()
+
 
 class Groqllm:
     def __init__(self):
-        load_dotenv()   
+        load_env()
         self.groq_api_key = os.getenv("GROQ_API_KEY")
         self.llm = None
         
@@ -13,9 +23,12 @@ class Groqllm:
         try:
             if not self.groq_api_key:
                 raise ValueError("GROQ_API_KEY not found in environment variables")
-            
+
+            # Importing the Groq SDK is a noticeable share of cold start
+            from langchain_groq import ChatGroq
+
             os.environ["GROQ_API_KEY"] = self.groq_api_key
-            self.llm = ChatGroq(api_key=self.groq_api_key, model="openai/gpt-oss-120b")
+            self.llm = ChatGroq(api_key=self.groq_api_key, model=MODEL_NAME)
             return self.llm
         except Exception as e:
             raise ValueError(f"Error occurred with exception: {e}")
@@ -23,7 +36,40 @@ class Groqllm:
     def invoke(self, message):
         """Get a response from the LLM for the given message"""
         if not self.llm:
-            self.get_llm()
+            self.llm = get_llm()
         
         response = self.llm.invoke(message)
-        return response.content
\ No newline at end of file
+        return response.content
+
+
+@lru_cache(maxsize=1)
+def get_llm():
+    """
+    The chat model client shared by every chain in the process, built on
+    first use so importing the graph does not need GROQ_API_KEY or the SDK.
+
+    Returns:
+        BaseChatModel: The shared client
+    """
+    return Groqllm().get_llm()
+
+
+def lazy_exports(module_name, getters):
+    """
+    Build a module-level `__getattr__` that resolves each name in `getters`
+    by calling its getter, so chains stay importable by name but are only
+    built when first used.
+
+    Args:
+        module_name (str): `__name__` of the calling module
+        getters (dict): Attribute name -> zero-argument getter
+
+    Returns:
+        callable: The module `__getattr__`
+    """
+    def __getattr__(name):
+        getter = getters.get(name)
+        if getter is None:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        return getter()
+    return __getattr__
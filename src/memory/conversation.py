@@ -0,0 +1,172 @@
+# Bounded conversation memory. Each question carries the last
+# MEMORY_RECENT_TURNS turns verbatim plus a rolling summary of older turns,
+# trimmed to MEMORY_TOKEN_BUDGET, so the history added to a prompt stays the
+# same size however long a session runs. The summary is kept by the caller
+# (the API stores it on the chat session) and updated with `asummarize`.
+# Follow-ups are rewritten into stand-alone questions with `condense_question`
+# before routing, retrieval and the semantic cache see them.
+import logging
+import os
+from functools import lru_cache
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from src.cache.llm_cache import cached_chain
+from src.llms.llm import get_llm
+
+logger = logging.getLogger(__name__)
+
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+# Approximate tokens of history (summary and recent turns) sent with a question
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1200"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You maintain a running summary of a conversation between a user and the Sunmarke School assistant. Merge the new lines into the current summary. Keep names, numbers and anything the user may refer back to; drop greetings and filler. Reply with the updated summary only, in at most 150 words."),
+    ("human", "Current summary:\n{summary}\n\nNew lines of conversation:\n{lines}\n\nUpdated summary:"),
+])
+
+# Label of the user's latest message in the condense prompt
+FOLLOW_UP_LABEL = "Follow-up question:"
+
+condense_prompt = ChatPromptTemplate.from_messages([
+    ("system", "Rewrite the user's latest message to the Sunmarke School assistant as a stand-alone question that can be understood without the conversation, resolving references such as 'it', 'they' or 'what about ...' from it. Keep the user's wording and language, do not answer the question, and return it unchanged if it already stands alone. Reply with the question only."),
+    ("human", "Conversation:\n{conversation}\n\n" + FOLLOW_UP_LABEL + " {question}\n\nStand-alone question:"),
+])
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _truncate(text, tokens):
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " ..."
+
+
+def recent_message_limit():
+    """How many of a session's latest messages are sent verbatim."""
+    return 2 * MEMORY_RECENT_TURNS
+
+
+def build_history(summary, messages):
+    """
+    Assemble the conversation history sent with a question.
+
+    Args:
+        summary (str | None): Rolling summary of turns older than `messages`
+        messages (list): Recent (role, content) pairs, oldest first
+
+    Returns:
+        list: Chat messages to place before the question; empty for a new session
+    """
+    budget = MEMORY_TOKEN_BUDGET
+    history = []
+    if summary:
+        summary = _truncate(summary, min(MEMORY_SUMMARY_TOKENS, budget))
+        budget -= estimate_tokens(summary)
+        history.append(SystemMessage(f"Summary of the earlier conversation:\n{summary}"))
+
+    # Newest turns first, so the budget drops the oldest ones
+    recent = []
+    for role, content in reversed(messages[-recent_message_limit():] if messages else []):
+        if budget <= 0:
+            break
+        content = _truncate(content, budget)
+        budget -= estimate_tokens(content)
+        recent.append(AIMessage(content) if role == "assistant" else HumanMessage(content))
+    return history + recent[::-1]
+
+
+def format_lines(messages):
+    return "\n".join(
+        f"{'Assistant' if role == 'assistant' else 'User'}: {_truncate(content, MEMORY_SUMMARY_TOKENS)}"
+        for role, content in messages
+    )
+
+
+def _conversation_text(history):
+    lines = []
+    for message in history:
+        if isinstance(message, SystemMessage):
+            lines.append(message.content)
+        else:
+            role = "Assistant" if isinstance(message, AIMessage) else "User"
+            lines.append(f"{role}: {message.content}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=1)
+def get_condenser():
+    return cached_chain("question_condenser", condense_prompt | get_llm() | StrOutputParser())
+
+
+def _condense_input(question, history):
+    return {"conversation": _conversation_text(history), "question": question}
+
+
+def _standalone(question, rewritten):
+    rewritten = rewritten.strip().strip('"').strip()
+    return rewritten or question
+
+
+def condense_question(question, history):
+    """
+    Rewrite a follow-up into a question that stands on its own, so the
+    semantic cache, router and retriever see what is actually being asked.
+
+    Args:
+        question (str): The user's latest message
+        history (list): Chat messages from `build_history`
+
+    Returns:
+        str: The stand-alone question; `question` itself without history or
+        when the rewrite fails
+    """
+    if not history:
+        return question
+    try:
+        return _standalone(question, get_condenser().invoke(_condense_input(question, history)))
+    except Exception as e:
+        logger.warning("Could not rewrite follow-up %r, using it as asked: %s", question, e)
+        return question
+
+
+async def acondense_question(question, history):
+    """Async variant of `condense_question`."""
+    if not history:
+        return question
+    try:
+        rewritten = await get_condenser().ainvoke(_condense_input(question, history))
+        return _standalone(question, rewritten)
+    except Exception as e:
+        logger.warning("Could not rewrite follow-up %r, using it as asked: %s", question, e)
+        return question
+
+
+@lru_cache(maxsize=1)
+def get_summarizer():
+    return summary_prompt | get_llm() | StrOutputParser()
+
+
+async def asummarize(summary, messages):
+    """
+    Fold `messages` into the running summary.
+
+    Args:
+        summary (str | None): The current summary
+        messages (list): (role, content) pairs leaving the recent window, oldest first
+
+    Returns:
+        str: The updated summary
+    """
+    updated = await get_summarizer().ainvoke({
+        "summary": summary or "(none yet)",
+        "lines": format_lines(messages),
+    })
+    return _truncate(updated.strip(), MEMORY_SUMMARY_TOKENS)
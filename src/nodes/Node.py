@@ -1,20 +1,101 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
 from langchain_core.documents import Document
-from src.route.reposnse import rag_chain
-from src.route.rewriteprompt import question_rewriter
-from functools import lru_cache
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from src.route.reposnse import get_rag_chain, get_answer_chain, format_docs, ANSWER_TAG
+from src.route.keywords import TopicDetector
+from src.route.rewriteprompt import get_question_rewriter
+
+logger = logging.getLogger(__name__)
+
+# Document grading fan-out: concurrent grader calls, grading timeout in
+# seconds, and how many relevant documents are enough to stop early (0 = grade all)
+GRADE_MAX_CONCURRENCY = max(1, int(os.getenv("GRADE_MAX_CONCURRENCY", "4")))
+GRADE_TIMEOUT = float(os.getenv("GRADE_TIMEOUT", "15"))
+GRADE_MIN_RELEVANT = int(os.getenv("GRADE_MIN_RELEVANT", "0"))
+
+# How many retrieved documents go to grading (0 = all the retriever returns)
+# and how many graded documents are used as generation context
+RETRIEVE_TOP_N = int(os.getenv("RETRIEVE_TOP_N", "0"))
+GENERATE_TOP_N = max(1, int(os.getenv("GENERATE_TOP_N", "3")))
+
+# External topics whose answers get a web summary appended
+AUGMENT_TOPICS = TopicDetector.from_file()
 
 
-@lru_cache(maxsize=1)
 def get_chat_llm():
-    from src.llms.llm import Groqllm
-    return Groqllm().get_llm()
+    from src.llms.llm import get_llm
+    return get_llm()
 
 
-@lru_cache(maxsize=1)
 def get_web_search_tool():
-    from src.route.websearch import web_search_tool
-    return web_search_tool
+    """The shared web search tool, or None when web search is not configured."""
+    from src.route.websearch import get_web_search_tool as get_tool
+    return get_tool()
+
+
+def _web_search(question):
+    search = get_web_search_tool()
+    return search.search(question) if search is not None else []
+
+
+async def _aweb_search(question):
+    search = get_web_search_tool()
+    return await search.asearch(question) if search is not None else []
+
+
+def _as_list(docs):
+    """Normalize a retriever/state value into a list of Documents."""
+    if isinstance(docs, Document) or hasattr(docs, "page_content"):
+        return [docs]
+    if isinstance(docs, list):
+        return docs
+    return [docs]
+
 
+def _top_n(docs, n):
+    """First `n` documents, or all of them when n is 0."""
+    return docs[:n] if n > 0 else docs
+
+
+def _top_web_text(web_docs):
+    """Extract the text of the top web search result."""
+    if isinstance(web_docs, str):
+        return web_docs
+    if isinstance(web_docs, list):
+        if all(isinstance(d, dict) and "content" in d for d in web_docs):
+            return web_docs[0]["content"] if web_docs else ""
+        if all(hasattr(d, "page_content") for d in web_docs):
+            return web_docs[0].page_content if web_docs else ""
+        return str(web_docs[0]) if web_docs else ""
+    if hasattr(web_docs, "page_content"):
+        return web_docs.page_content
+    return str(web_docs)
+
+
+def _web_documents(docs):
+    """Normalize different possible web search return types into a list of Documents."""
+    if not docs:
+        # No results, or web search is disabled
+        return []
+    if isinstance(docs, str):
+        return [Document(page_content=docs)]
+    if isinstance(docs, list):
+        # List of dicts with 'content'
+        if all(isinstance(d, dict) and "content" in d for d in docs):
+            web_text = "\n".join(d["content"] for d in docs)
+            return [Document(page_content=web_text)]
+        # List of Document-like objects
+        if all(hasattr(d, "page_content") for d in docs):
+            return docs
+        return [Document(page_content="\n".join(map(str, docs)))]
+    if hasattr(docs, "page_content"):
+        return [docs]
+    return [Document(page_content=str(docs))]
 
 
 def retrieve(state):
@@ -27,98 +108,208 @@ def retrieve(state):
     Returns:
         state (dict): New key added to state, documents, that contains retrieved documents
     """
-    print("---RETRIEVE---")
+    logger.debug("---RETRIEVE---")
     question = state["question"]
 
-    # Lazy-load the vectorstore retriever to avoid heavy imports at module import time
+    # Lazy-import the retrieval service to avoid heavy imports at module import time;
+    # the vectorstore itself is loaded once per process and reused here
     from src.rags.rag import get_vectorstore
 
     _, retriever = get_vectorstore(force_recreate=False)
 
-    # Retrieval - ask for results and keep only the top result (k=1)
+    # Retrieval - the retriever's k and thresholds are configured in src/rags/rag.py
     docs = retriever.invoke(question)
 
-    # Normalize to list of Documents
-    if hasattr(docs, "page_content"):
-        docs_list = [docs]
-    elif isinstance(docs, list):
-        docs_list = docs
-    else:
-        docs_list = [docs]
+    top_docs = _top_n(_as_list(docs), RETRIEVE_TOP_N)
+    return {"documents": top_docs, "question": question, "datasource": "vectorstore"}
+
+
+async def aretrieve(state):
+    """Async variant of `retrieve`."""
+    logger.debug("---RETRIEVE---")
+    question = state["question"]
+
+    from src.rags.rag import get_vectorstore
+
+    # The first call may load the index from disk; keep that off the event loop
+    _, retriever = await asyncio.to_thread(get_vectorstore, False)
+    docs = await retriever.ainvoke(question)
+
+    top_docs = _top_n(_as_list(docs), RETRIEVE_TOP_N)
+    return {"documents": top_docs, "question": question, "datasource": "vectorstore"}
+
+
+def _fetch_augmentation(question, topic):
+    """Web search the question and summarize the top result for `topic`."""
+    try:
+        web_text = _top_web_text(_web_search(question))
+        if not web_text:
+            return ""
+        web_summary = get_answer_chain().invoke({"context": web_text, "question": question})
+    except Exception as e:
+        logger.warning("Augmentation for %s failed: %s", topic, e)
+        return ""
+    return f"\n\nAbout {topic}:\n{web_summary}"
+
+
+async def _afetch_augmentation(question, topic):
+    """Async variant of `_fetch_augmentation`."""
+    try:
+        web_text = _top_web_text(await _aweb_search(question))
+        if not web_text:
+            return ""
+        web_summary = await get_answer_chain().ainvoke({"context": web_text, "question": question})
+    except Exception as e:
+        logger.warning("Augmentation for %s failed: %s", topic, e)
+        return ""
+    return f"\n\nAbout {topic}:\n{web_summary}"
+
+
+def _augmentation_topic(state):
+    """
+    Topic to augment the answer with, if any. Only the first pass through
+    `generate` detects it; retries reuse the `augmentation` already in state.
+    """
+    if state.get("augmentation") is not None:
+        return None
+    topic = AUGMENT_TOPICS.detect(state["question"])
+    if topic:
+        logger.debug("---GENERATE: AUGMENTING ANSWER WITH %s WEB SUMMARY---", topic)
+    return topic
 
-    top_docs = docs_list[:1]
-    return {"documents": top_docs, "question": question}
 
 def generate(state):
     """
     Generate an answer
 
+    If the question also asks about an external topic (see `augment_topics`
+    in src/route/router_keywords.json), a web summary for it is fetched
+    concurrently with the answer and appended to it.
+
     Args:
         state (dict): The current graph state
 
     Returns:
         state (dict): New key added to state, generation, that contains the LLM generation
     """
-    print("---GENERATE---")
+    logger.debug("---GENERATE---")
     question = state["question"]
     documents = state["documents"]
 
-    # Normalize documents and use only the top document as context
-    if isinstance(documents, Document):
-        docs_list = [documents]
-    elif isinstance(documents, list):
-        docs_list = documents
-    else:
-        docs_list = [documents]
-
-    top_docs = docs_list[:1]
-    context = top_docs[0].page_content if top_docs else ""
-
-    # Generation using only the top document
-    generation = rag_chain.invoke({"context": context, "question": question})
-
-    # If the user also asks about AI, fetch a web summary and append it
-    ql = question.lower()
-    if "ai" in ql or "artificial intelligence" in ql:
-        # call web search tool and summarize top result
-        web_docs = get_web_search_tool().invoke(question)
-        # normalize
-        if isinstance(web_docs, str):
-            web_text = web_docs
-        elif isinstance(web_docs, list):
-            if all(isinstance(d, dict) and "content" in d for d in web_docs):
-                web_text = web_docs[0]["content"] if web_docs else ""
-            elif all(hasattr(d, "page_content") for d in web_docs):
-                web_text = web_docs[0].page_content if web_docs else ""
-            else:
-                web_text = str(web_docs[0]) if web_docs else ""
-        elif hasattr(web_docs, "page_content"):
-            web_text = web_docs.page_content
-        else:
-            web_text = str(web_docs)
+    # Normalize documents and use the top GENERATE_TOP_N documents as context
+    top_docs = _as_list(documents)[:GENERATE_TOP_N]
+    context = format_docs(top_docs)
+
+    topic = _augmentation_topic(state)
+    if topic:
+        pool = ContextThreadPoolExecutor(max_workers=1)
+        augmentation_future = pool.submit(_fetch_augmentation, question, topic)
+        pool.shutdown(wait=False)
+
+    # Generation using the top documents
+    generation = get_rag_chain().invoke(
+        {"context": context, "question": question, "history": state.get("history") or []}
+    )
+
+    augmentation = augmentation_future.result() if topic else state.get("augmentation") or ""
+    return {"documents": top_docs, "question": question,
+            "generation": generation + augmentation, "augmentation": augmentation}
+
 
-        if web_text:
-            web_summary = rag_chain.invoke({"context": web_text, "question": question})
-            combined = f"{generation}\n\nAbout AI:\n{web_summary}"
-            return {"documents": top_docs, "question": question, "generation": combined}
+async def agenerate(state):
+    """Async variant of `generate`."""
+    logger.debug("---GENERATE---")
+    question = state["question"]
+    documents = state["documents"]
+
+    top_docs = _as_list(documents)[:GENERATE_TOP_N]
+    context = format_docs(top_docs)
+
+    inputs = {"context": context, "question": question, "history": state.get("history") or []}
+    topic = _augmentation_topic(state)
+    if topic:
+        generation, augmentation = await asyncio.gather(
+            get_rag_chain().ainvoke(inputs),
+            _afetch_augmentation(question, topic),
+        )
+    else:
+        generation = await get_rag_chain().ainvoke(inputs)
+        augmentation = state.get("augmentation") or ""
 
-    return {"documents": top_docs, "question": question, "generation": generation}
+    return {"documents": top_docs, "question": question,
+            "generation": generation + augmentation, "augmentation": augmentation}
 
 
 def chat(state):
     """
     Handle normal conversational prompts without RAG/web retrieval.
     """
-    print("---CHAT---")
+    logger.debug("---CHAT---")
+    question = state["question"]
+    llm = get_chat_llm()
+    messages = [*(state.get("history") or []), HumanMessage(question)]
+    generation = llm.invoke(messages, config={"tags": [ANSWER_TAG]}).content
+    return {"documents": [], "question": question, "generation": generation,
+            "datasource": "chat"}
+
+
+async def achat(state):
+    """Async variant of `chat`."""
+    logger.debug("---CHAT---")
     question = state["question"]
     llm = get_chat_llm()
-    generation = llm.invoke(question).content
-    return {"documents": [], "question": question, "generation": generation}
+    messages = [*(state.get("history") or []), HumanMessage(question)]
+    generation = (await llm.ainvoke(messages, config={"tags": [ANSWER_TAG]})).content
+    return {"documents": [], "question": question, "generation": generation,
+            "datasource": "chat"}
+
+def _enough_relevant(verdicts):
+    """True once GRADE_MIN_RELEVANT documents have been graded relevant."""
+    return GRADE_MIN_RELEVANT > 0 and sum(v is True for v in verdicts) >= GRADE_MIN_RELEVANT
+
+
+def _prescreen(question, documents):
+    """
+    Run the local reranker, if enabled. Returns the documents in rerank order
+    with a verdict per document; None marks those the LLM grader must decide.
+    """
+    from src.rags.rerank import get_reranker
+
+    reranker = get_reranker()
+    if reranker is None or not documents:
+        return documents, [None] * len(documents)
+    documents, verdicts = reranker.triage(question, documents)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("---RERANK: %d kept, %d dropped, %d borderline---",
+                     sum(v is True for v in verdicts), sum(v is False for v in verdicts),
+                     sum(v is None for v in verdicts))
+    return documents, verdicts
+
+
+def _filter_graded(documents, verdicts):
+    """Keep relevant documents in their (re)ranked order."""
+    filtered_docs = []
+    for d, verdict in zip(documents, verdicts):
+        if verdict:
+            logger.debug("---GRADE: DOCUMENT RELEVANT---")
+            filtered_docs.append(d)
+        elif verdict is None:
+            logger.debug("---GRADE: DOCUMENT NOT GRADED (TIMEOUT OR EARLY EXIT)---")
+        else:
+            logger.debug("---GRADE: DOCUMENT NOT RELEVANT---")
+    return filtered_docs
+
 
 def grade_documents(state):
     """
     Determines whether the retrieved documents are relevant to the question.
 
+    With RERANK_MODE set, a local reranker orders the documents and decides
+    the clear cases; the LLM grader only sees borderline ones. Those are
+    graded concurrently (at most GRADE_MAX_CONCURRENCY at a time); grading
+    stops early once GRADE_MIN_RELEVANT documents are relevant, and grades
+    still outstanding after GRADE_TIMEOUT seconds count as not relevant.
+
     Args:
         state (dict): The current graph state
 
@@ -126,27 +317,93 @@ def grade_documents(state):
         state (dict): Updates documents key with only filtered relevant documents
     """
 
-    print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+    logger.debug("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
     question = state["question"]
-    documents = state["documents"]
+    documents, verdicts = _prescreen(question, state["documents"])
 
-    # Lazy import to avoid heavy dependencies at module import time
-    from src.route.Grade import retrieval_grader
+    # Score each borderline doc
+    borderline = [i for i, v in enumerate(verdicts) if v is None]
+    if not borderline or _enough_relevant(verdicts):
+        return {"documents": _filter_graded(documents, verdicts), "question": question}
 
-    # Score each doc
-    filtered_docs = []
-    for d in documents:
-        score = retrieval_grader.invoke(
-            {"question": question, "document": d.page_content}
-        )
-        grade = score.binary_score
-        if grade == "yes":
-            print("---GRADE: DOCUMENT RELEVANT---")
-            filtered_docs.append(d)
-        else:
-            print("---GRADE: DOCUMENT NOT RELEVANT---")
-            continue
-    return {"documents": filtered_docs, "question": question}
+    # Lazy import to avoid heavy dependencies at module import time
+    from src.route.Grade import get_retrieval_grader
+    retrieval_grader = get_retrieval_grader()
+
+    # Context-propagating pool so grader runs stay attached to the graph's callbacks
+    pool = ContextThreadPoolExecutor(max_workers=min(GRADE_MAX_CONCURRENCY, len(borderline)))
+    futures = {
+        pool.submit(retrieval_grader.invoke,
+                    {"question": question, "document": documents[i].page_content}): i
+        for i in borderline
+    }
+    pending = set(futures)
+    deadline = time.monotonic() + GRADE_TIMEOUT
+    try:
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=max(0.0, deadline - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for future in done:
+                verdicts[futures[future]] = future.result().binary_score == "yes"
+            if _enough_relevant(verdicts):
+                break
+    finally:
+        # Drop grades that have not started; running ones finish in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return {"documents": _filter_graded(documents, verdicts), "question": question}
+
+
+async def agrade_documents(state):
+    """Async variant of `grade_documents`, with the same overall GRADE_TIMEOUT."""
+    logger.debug("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+    question = state["question"]
+    # Cross-encoder inference is CPU work; keep it off the event loop
+    documents, verdicts = await asyncio.to_thread(_prescreen, question, state["documents"])
+
+    borderline = [i for i, v in enumerate(verdicts) if v is None]
+    if not borderline or _enough_relevant(verdicts):
+        return {"documents": _filter_graded(documents, verdicts), "question": question}
+
+    from src.route.Grade import get_retrieval_grader
+    retrieval_grader = get_retrieval_grader()
+
+    semaphore = asyncio.Semaphore(GRADE_MAX_CONCURRENCY)
+
+    async def grade(d):
+        async with semaphore:
+            score = await retrieval_grader.ainvoke(
+                {"question": question, "document": d.page_content}
+            )
+        return score.binary_score == "yes"
+
+    tasks = {asyncio.create_task(grade(documents[i])): i for i in borderline}
+    pending = set(tasks)
+    deadline = time.monotonic() + GRADE_TIMEOUT
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=max(0.0, deadline - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                # Out of time; unfinished grades count as not relevant
+                break
+            for task in done:
+                verdicts[tasks[task]] = task.result()
+            if _enough_relevant(verdicts):
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return {"documents": _filter_graded(documents, verdicts), "question": question}
 
 
 def transform_query(state):
@@ -160,12 +417,22 @@ def transform_query(state):
         state (dict): Updates question key with a re-phrased question
     """
 
-    print("---TRANSFORM QUERY---")
+    logger.debug("---TRANSFORM QUERY---")
     question = state["question"]
     documents = state["documents"]
 
     # Re-write question
-    better_question = question_rewriter.invoke({"question": question})
+    better_question = get_question_rewriter().invoke({"question": question})
+    return {"documents": documents, "question": better_question}
+
+
+async def atransform_query(state):
+    """Async variant of `transform_query`."""
+    logger.debug("---TRANSFORM QUERY---")
+    question = state["question"]
+    documents = state["documents"]
+
+    better_question = await get_question_rewriter().ainvoke({"question": question})
     return {"documents": documents, "question": better_question}
 
 def web_search(state):
@@ -179,30 +446,22 @@ def web_search(state):
         state (dict): Updates documents key with appended web results
     """
 
-    print("---WEB SEARCH---")
+    logger.debug("---WEB SEARCH---")
     question = state["question"]
 
-    # Web search
-    # The Tavily tool may accept a raw string or a dict; call with the string.
-    docs = get_web_search_tool().invoke(question)
+    # Web search; cached and bounded by WEB_SEARCH_TIMEOUT (src/route/websearch.py)
+    docs = _web_search(question)
 
-    # Normalize different possible return types into a list of Documents
-    if isinstance(docs, str):
-        web_results = Document(page_content=docs)
-        documents = [web_results]
-    elif isinstance(docs, list):
-        # List of dicts with 'content'
-        if all(isinstance(d, dict) and "content" in d for d in docs):
-            web_text = "\n".join(d["content"] for d in docs)
-            documents = [Document(page_content=web_text)]
-        # List of Document-like objects
-        elif all(hasattr(d, "page_content") for d in docs):
-            documents = docs
-        else:
-            documents = [Document(page_content="\n".join(map(str, docs)))]
-    elif hasattr(docs, "page_content"):
-        documents = [docs]
-    else:
-        documents = [Document(page_content=str(docs))]
+    return {"documents": _web_documents(docs), "question": question,
+            "datasource": "web_search"}
+
+
+async def aweb_search(state):
+    """Async variant of `web_search`."""
+    logger.debug("---WEB SEARCH---")
+    question = state["question"]
+
+    docs = await _aweb_search(question)
 
-    return {"documents": documents, "question": question}
+    return {"documents": _web_documents(docs), "question": question,
+            "datasource": "web_search"}
@@ -0,0 +1,212 @@
+# Per-question tracing for the graph. `trace_request` opens a trace in a
+# context variable; instrumented nodes and edges, the caches and the token
+# callback add to it, and closing it records the request-level metrics.
+import asyncio
+import functools
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from src.observability.metrics import (
+    CACHE_LOOKUPS, LLM_TOKENS, LOOPS, REQUEST_SECONDS, STEP_ERRORS, STEP_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+_current_trace = ContextVar("graph_trace", default=None)
+# LangChain adds the handler held here to every run configured while it is set
+_token_counter = ContextVar("graph_token_counter", default=None)
+register_configure_hook(_token_counter, inheritable=True)
+
+
+def new_trace_id():
+    return uuid.uuid4().hex
+
+
+class RequestTrace:
+    """Steps, tokens and cache lookups of one question."""
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or new_trace_id()
+        self.started = time.perf_counter()
+        self.steps = []  # (name, kind, seconds)
+        self.visits = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.cache = {}
+        self.datasource = None
+        self._lock = threading.Lock()
+
+    def add_step(self, name, kind, seconds):
+        with self._lock:
+            self.steps.append((name, kind, round(seconds, 4)))
+            if kind == "node":
+                self.visits[name] = self.visits.get(name, 0) + 1
+
+    def add_tokens(self, prompt, completion):
+        with self._lock:
+            self.tokens["prompt"] += prompt
+            self.tokens["completion"] += completion
+
+    def add_cache_lookup(self, cache, hit):
+        with self._lock:
+            counts = self.cache.setdefault(cache, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def summary(self):
+        with self._lock:
+            return {
+                "trace_id": self.trace_id,
+                "seconds": round(time.perf_counter() - self.started, 4),
+                "datasource": self.datasource,
+                "steps": list(self.steps),
+                "tokens": dict(self.tokens),
+                "cache": {k: dict(v) for k, v in self.cache.items()},
+                "transform_query_loops": self.visits.get("transform_query", 0),
+                "regenerations": max(0, self.visits.get("generate", 0) - 1),
+            }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+class _TokenCounter(BaseCallbackHandler):
+    """Attribute LLM token usage to the graph step that made the call."""
+
+    run_inline = True
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.steps = {}
+
+    def _start(self, run_id, metadata):
+        self.steps[run_id] = (metadata or {}).get("langgraph_node", "none")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        step = self.steps.pop(run_id, "none")
+        prompt = completion = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt += usage.get("input_tokens", 0)
+                    completion += usage.get("output_tokens", 0)
+        if not prompt and not completion:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt = usage.get("prompt_tokens", 0)
+            completion = usage.get("completion_tokens", 0)
+        if prompt or completion:
+            LLM_TOKENS.inc(prompt, step=step, type="prompt")
+            LLM_TOKENS.inc(completion, step=step, type="completion")
+            self.trace.add_tokens(prompt, completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.steps.pop(run_id, None)
+
+
+def record_cache_lookup(cache, hit):
+    """Count a cache lookup in the metrics and the current trace, if any."""
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_cache_lookup(cache, hit)
+
+
+@contextmanager
+def trace_request(trace_id=None):
+    """
+    Trace one question. Nested calls join the enclosing trace, so an endpoint
+    can open the trace before `answer_question` does.
+
+    Yields:
+        RequestTrace: The active trace
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        yield trace
+        return
+
+    trace = RequestTrace(trace_id)
+    trace_token = _current_trace.set(trace)
+    counter_token = _token_counter.set(_TokenCounter(trace))
+    try:
+        yield trace
+    finally:
+        try:
+            _current_trace.reset(trace_token)
+            _token_counter.reset(counter_token)
+        except ValueError:
+            # Closed from another context, e.g. a streaming response cancelled
+            # by a disconnecting client; that context is discarded anyway
+            pass
+        summary = trace.summary()
+        REQUEST_SECONDS.observe(summary["seconds"], datasource=summary["datasource"] or "none")
+        LOOPS.observe(summary["transform_query_loops"], loop="transform_query")
+        LOOPS.observe(summary["regenerations"], loop="regenerate")
+        logger.info("trace %s", summary)
+
+
+def _record_step(name, kind, seconds, result):
+    STEP_SECONDS.observe(seconds, step=name, kind=kind)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_step(name, kind, seconds)
+        if isinstance(result, dict) and result.get("datasource"):
+            trace.datasource = result["datasource"]
+
+
+def instrument(func, kind, name=None):
+    """
+    Wrap a graph node or edge function (sync or async) to record its wall
+    time and errors.
+
+    Args:
+        func (callable): Node or edge implementation
+        kind (str): "node" or "edge"
+        name (str): Metric label; defaults to the function name
+
+    Returns:
+        callable: The wrapped function, with the same name and signature
+    """
+    name = name or func.__name__
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = await func(*args, **kwargs)
+                return result
+            except Exception:
+                STEP_ERRORS.inc(step=name, kind=kind)
+                raise
+            finally:
+                _record_step(name, kind, time.perf_counter() - start, result)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception:
+            STEP_ERRORS.inc(step=name, kind=kind)
+            raise
+        finally:
+            _record_step(name, kind, time.perf_counter() - start, result)
+    return wrapper
@@ -0,0 +1,185 @@
+# Sparse BM25 index over the vectorstore chunks, and the hybrid retriever that
+# fuses it with dense FAISS results by reciprocal rank fusion.
+import logging
+import re
+from pathlib import Path
+from typing import Any, List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+logger = logging.getLogger(__name__)
+
+BM25_FILENAME = "bm25.npz"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# "45,000" and "45000" should be the same token
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3}\b)")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(_THOUSANDS_RE.sub("", text.lower()))
+
+
+class BM25Index:
+    """
+    Compact inverted index in CSR form: for term t, `postings[indptr[t]:indptr[t+1]]`
+    are the documents containing it and `tfs` the matching term frequencies.
+    """
+
+    def __init__(self, doc_ids, terms, indptr, postings, tfs, doc_len, k1=1.5, b=0.75):
+        self.doc_ids = list(doc_ids)
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.terms = terms
+        self.indptr = indptr
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        n = len(self.doc_ids)
+        df = np.diff(indptr).astype(np.float32)
+        self.idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(doc_len.mean()) if n else 1.0
+        self._norm = (k1 * (1 - b + b * doc_len / max(avgdl, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, doc_ids, texts):
+        """Index `texts`, identified by the matching vectorstore `doc_ids`."""
+        vocab = {}
+        rows = []  # (term index, doc index, tf)
+        doc_len = np.zeros(len(doc_ids), dtype=np.float32)
+        for doc_index, text in enumerate(texts):
+            counts = {}
+            tokens = tokenize(text)
+            doc_len[doc_index] = len(tokens)
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                rows.append((vocab.setdefault(token, len(vocab)), doc_index, tf))
+
+        terms = sorted(vocab)
+        remap = np.empty(len(vocab), dtype=np.int64)
+        for new, term in enumerate(terms):
+            remap[vocab[term]] = new
+        if rows:
+            data = np.asarray(rows, dtype=np.int64)
+            data[:, 0] = remap[data[:, 0]]
+            data = data[np.lexsort((data[:, 1], data[:, 0]))]
+        else:
+            data = np.zeros((0, 3), dtype=np.int64)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.add.at(indptr, data[:, 0] + 1, 1)
+        indptr = np.cumsum(indptr)
+        return cls(
+            doc_ids,
+            terms,
+            indptr,
+            data[:, 1].astype(np.int32),
+            data[:, 2].astype(np.float32),
+            doc_len,
+        )
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        doc_ids = list(vectorstore.index_to_docstore_id.values())
+        texts = [vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids]
+        return cls.build(doc_ids, texts)
+
+    def save(self, path):
+        np.savez(
+            path,
+            doc_ids=np.asarray(self.doc_ids, dtype=str),
+            terms=np.asarray(self.terms, dtype=str),
+            indptr=self.indptr,
+            postings=self.postings,
+            tfs=self.tfs,
+            doc_len=self.doc_len,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["doc_ids"].tolist(),
+                data["terms"].tolist(),
+                data["indptr"],
+                data["postings"],
+                data["tfs"],
+                data["doc_len"],
+            )
+
+    def search(self, query, k):
+        """
+        Score the query against every document.
+
+        Returns:
+            list: (doc_id, score) for the top `k` documents with a non-zero score
+        """
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for token in set(tokenize(query)):
+            t = self.vocab.get(token)
+            if t is None:
+                continue
+            start, end = self.indptr[t], self.indptr[t + 1]
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end]
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1) / (tf + self._norm[docs])
+        nonzero = np.flatnonzero(scores)
+        if not len(nonzero):
+            return []
+        if len(nonzero) > k:
+            nonzero = nonzero[np.argpartition(-scores[nonzero], k - 1)[:k]]
+        top = nonzero[np.argsort(-scores[nonzero])]
+        return [(self.doc_ids[i], float(scores[i])) for i in top]
+
+
+def load_or_build_bm25(vectorstore, index_path):
+    """
+    Load the BM25 index saved next to the FAISS index, or build it in memory
+    from the docstore when it is missing or out of date.
+    """
+    path = Path(index_path) / BM25_FILENAME
+    if path.exists():
+        bm25 = BM25Index.load(path)
+        if set(bm25.doc_ids) == set(vectorstore.index_to_docstore_id.values()):
+            return bm25
+        logger.warning("BM25 index is out of date, rebuilding it in memory")
+    return BM25Index.from_vectorstore(vectorstore)
+
+
+def _doc_key(doc):
+    return doc.page_content, tuple(sorted((k, str(v)) for k, v in doc.metadata.items()))
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense FAISS search and BM25 fused with reciprocal rank fusion."""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        fused = {}
+
+        dense = self.vectorstore.similarity_search(query, k=self.fetch_k)
+        for rank, doc in enumerate(dense):
+            key = _doc_key(doc)
+            fused[key] = [1.0 / (self.rrf_k + rank + 1), doc]
+
+        for rank, (doc_id, _) in enumerate(self.bm25.search(query, self.fetch_k)):
+            doc = self.vectorstore.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                continue
+            key = _doc_key(doc)
+            entry = fused.setdefault(key, [0.0, doc])
+            entry[0] += 1.0 / (self.rrf_k + rank + 1)
+
+        ranked = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)
+        return [doc for _, doc in ranked[: self.k]]
@@ -0,0 +1,356 @@
+"""
+Incremental vectorstore build pipeline.
+
+Records are streamed from the JSON source, hashed, and split into chunks
+whose ids are content hashes. A manifest saved next to the index remembers
+which chunks each record produced, so a rebuild only embeds new or changed
+chunks and deletes stale vectors by id. Embedding runs in batches across a
+process pool while the source is still being read. A BM25 index over the
+same chunks is saved alongside for hybrid retrieval.
+
+Compressed index types (src/rags/store.py) are trained on a full build.
+IVF-PQ and HNSW cannot drop vectors in place, so a change that deletes
+chunks from them triggers a full rebuild instead.
+
+    python -m src.rags.indexer build-index [--full] [--workers N] [--batch-size N]
+                                           [--format pickle|mmap] [--index-type TYPE]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.rags.bm25 import BM25_FILENAME, BM25Index
+from src.rags.rag import BASE_DIR, EMBEDDING_MODEL_NAME, VECTORSTORE_PATH, get_embeddings
+from src.rags.store import (
+    DELETABLE_INDEX_TYPES, FORMATS, INDEX_FORMAT, INDEX_TYPE, INDEX_TYPES,
+    build_faiss_index, detect_format, load_vectorstore, save_vectorstore,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 1) // 2))
+
+
+def default_source():
+    """The cleaned export if present, otherwise the raw one."""
+    cleaned = BASE_DIR / "school_data_cleaned.json"
+    return cleaned if cleaned.exists() else BASE_DIR / "school_data.json"
+
+
+def iter_json_array(path, read_size=1 << 16):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        started = False
+        eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer and not eof:
+                    chunk = f.read(read_size)
+                    eof = not chunk
+                    buffer += chunk
+                    continue
+                if not buffer.startswith("["):
+                    raise ValueError(f"{path} does not contain a JSON array")
+                buffer = buffer[1:]
+                started = True
+                continue
+            buffer = buffer.lstrip(", \n\r\t")
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def _hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def record_hash(record):
+    return _hash(json.dumps(record, sort_keys=True, ensure_ascii=False))
+
+
+def record_document(record):
+    """Convert a JSON record to a Document (same metadata as the original build)."""
+    return Document(
+        page_content=record.get('content', ''),
+        metadata={
+            "id": record.get('id', 0),
+            "url": record.get('url', ''),
+            "section": record.get('section', ''),
+            "subsection": record.get('subsection', '')
+        }
+    )
+
+
+def get_text_splitter():
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=500,
+        chunk_overlap=0
+    )
+
+
+def chunk_id(chunk):
+    return _hash(json.dumps(chunk.metadata, sort_keys=True), chunk.page_content)
+
+
+def load_manifest(index_path=VECTORSTORE_PATH):
+    path = Path(index_path) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, index_path=VECTORSTORE_PATH):
+    path = Path(index_path) / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+# Embedding workers: each process loads the model once in its initializer
+_worker_embeddings = None
+
+
+def _init_worker():
+    global _worker_embeddings
+    try:
+        import torch
+        # One intra-op thread per process; the pool provides the parallelism
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _worker_embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def _embed_batch(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+class _Embedder:
+    """Submit batches as they fill; in-process when a single worker is requested."""
+
+    def __init__(self, workers, batch_size):
+        self.batch_size = batch_size
+        self.pool = ProcessPoolExecutor(workers, initializer=_init_worker) if workers > 1 else None
+        self.pending = []  # (chunks, future or embeddings)
+        self.batch = []
+
+    def add(self, chunk_id, chunk):
+        self.batch.append((chunk_id, chunk))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        texts = [chunk.page_content for _, chunk in self.batch]
+        if self.pool is not None:
+            result = self.pool.submit(_embed_batch, texts)
+        else:
+            result = get_embeddings().embed_documents(texts)
+        self.pending.append((self.batch, result))
+        self.batch = []
+
+    def results(self):
+        """Yield (ids, chunks, embeddings) per batch, in submission order."""
+        self.flush()
+        try:
+            for batch, result in self.pending:
+                embeddings = result.result() if self.pool is not None else result
+                ids = [cid for cid, _ in batch]
+                chunks = [chunk for _, chunk in batch]
+                yield ids, chunks, embeddings
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+    def close(self):
+        """Abandon batches that have not been collected."""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def build_index(source=None, index_path=VECTORSTORE_PATH, full=False,
+                workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, index_format=None,
+                index_type=None):
+    """
+    Bring the on-disk vectorstore up to date with the JSON source.
+
+    Args:
+        source (Path): JSON array of records; defaults to `default_source()`
+        index_path (Path): Directory of the FAISS index
+        full (bool): Ignore the manifest and re-embed everything
+        workers (int): Embedding processes; 1 embeds in this process
+        batch_size (int): Chunks per embedding batch
+        index_format (str): "pickle" or "mmap"; defaults to INDEX_FORMAT
+        index_type (str): FAISS index type; defaults to INDEX_TYPE
+
+    Returns:
+        tuple: (vectorstore, stats dict)
+    """
+    start = time.perf_counter()
+    source = Path(source or default_source())
+    index_path = Path(index_path)
+    index_type = index_type or INDEX_TYPE
+
+    manifest = None if full else load_manifest(index_path)
+    if manifest is not None and manifest.get("embedding_model") != EMBEDDING_MODEL_NAME:
+        logger.warning("Embedding model changed, rebuilding the whole index")
+        manifest = None
+    if manifest is not None and manifest.get("index_type", "flat") != index_type:
+        logger.warning("Index type changed to %s, rebuilding the whole index", index_type)
+        manifest = None
+
+    vectorstore = None
+    if manifest is not None:
+        vectorstore = load_vectorstore(index_path, get_embeddings(), writable=True)
+    old_records = manifest["records"] if manifest else {}
+
+    splitter = get_text_splitter()
+    embedder = _Embedder(workers, batch_size)
+    new_records = {}
+    kept_ids = set()
+    stats = {"records": 0, "changed_records": 0, "chunks": 0, "embedded": 0, "deleted": 0}
+
+    for record in iter_json_array(source):
+        stats["records"] += 1
+        key = str(record.get("id", stats["records"]))
+        digest = record_hash(record)
+        previous = old_records.get(key)
+
+        if previous and previous["hash"] == digest:
+            new_records[key] = previous
+            kept_ids.update(previous["chunks"])
+            stats["chunks"] += len(previous["chunks"])
+            continue
+
+        stats["changed_records"] += 1
+        previous_ids = set(previous["chunks"]) if previous else set()
+        ids = []
+        for chunk in splitter.split_documents([record_document(record)]):
+            cid = chunk_id(chunk)
+            if cid in ids:
+                continue
+            ids.append(cid)
+            if cid not in previous_ids:
+                embedder.add(cid, chunk)
+        new_records[key] = {"hash": digest, "chunks": ids}
+        kept_ids.update(ids)
+        stats["chunks"] += len(ids)
+
+    if manifest is not None and index_type not in DELETABLE_INDEX_TYPES and any(
+        cid not in kept_ids for record in old_records.values() for cid in record["chunks"]
+    ):
+        embedder.close()
+        logger.warning("Chunks were removed and %s indexes cannot delete, rebuilding", index_type)
+        return build_index(source, index_path, full=True, workers=workers, batch_size=batch_size,
+                           index_format=index_format, index_type=index_type)
+
+    for ids, chunks, embeddings in embedder.results():
+        text_embeddings = list(zip([c.page_content for c in chunks], embeddings))
+        metadatas = [c.metadata for c in chunks]
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(
+                text_embeddings, get_embeddings(), metadatas=metadatas, ids=ids
+            )
+        else:
+            vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        stats["embedded"] += len(ids)
+
+    if vectorstore is not None:
+        stale = [cid for cid in vectorstore.index_to_docstore_id.values() if cid not in kept_ids]
+        if stale:
+            vectorstore.delete(stale)
+            stats["deleted"] = len(stale)
+
+    if vectorstore is None:
+        raise ValueError(f"No records found in {source}")
+
+    if manifest is None and index_type != "flat":
+        # Batches were collected in an exact index; train the compressed one on all of them
+        flat = vectorstore.index
+        vectorstore.index = build_faiss_index(flat.reconstruct_n(0, flat.ntotal), index_type)
+
+    index_format = index_format or INDEX_FORMAT
+    if stats["embedded"] or stats["deleted"] or manifest is None \
+            or detect_format(index_path) != index_format:
+        save_vectorstore(vectorstore, index_path, index_format)
+        # Sparse index over the same chunks for hybrid retrieval
+        BM25Index.from_vectorstore(vectorstore).save(index_path / BM25_FILENAME)
+        save_manifest(
+            {"embedding_model": EMBEDDING_MODEL_NAME, "index_type": index_type,
+             "source": str(source), "records": new_records},
+            index_path,
+        )
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["chunks_per_second"] = stats["embedded"] / stats["seconds"] if stats["embedded"] else 0.0
+    return vectorstore, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.rags.indexer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build-index", help="incrementally (re)build the FAISS index")
+    build.add_argument("--source", type=Path, default=None, help="JSON array of records")
+    build.add_argument("--index-path", type=Path, default=VECTORSTORE_PATH)
+    build.add_argument("--full", action="store_true", help="ignore the manifest and re-embed everything")
+    build.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    build.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    build.add_argument("--format", choices=FORMATS, default=INDEX_FORMAT,
+                       help="on-disk format, see src/rags/store.py")
+    build.add_argument("--index-type", choices=INDEX_TYPES, default=INDEX_TYPE)
+    args = parser.parse_args(argv)
+
+    _, stats = build_index(
+        source=args.source,
+        index_path=args.index_path,
+        full=args.full,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        index_format=args.format,
+        index_type=args.index_type,
+    )
+    print(
+        f"✓ {stats['records']} records ({stats['changed_records']} changed), "
+        f"{stats['chunks']} chunks: {stats['embedded']} embedded, {stats['deleted']} deleted "
+        f"in {stats['seconds']:.2f}s ({stats['chunks_per_second']:.1f} chunks/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
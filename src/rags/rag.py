@@ -1,132 +1,211 @@
-from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
-import json
+import logging
 import os
+import threading
+import time
 from pathlib import Path
 
+from src.rags.store import load_vectorstore
+
+logger = logging.getLogger(__name__)
+
 # Get the directory where this script is located
 BASE_DIR = Path(__file__).resolve().parent
 
 # Vectorstore path
 VECTORSTORE_PATH = BASE_DIR / "sunmarke_faiss_index"
 
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Retrieval parameters. RETRIEVER_SEARCH_TYPE is "similarity", "mmr" or
+# "similarity_score_threshold"; FETCH_K and LAMBDA_MULT only apply to MMR and
+# SCORE_THRESHOLD (relevance in 0..1) only to the threshold search.
+RETRIEVER_SEARCH_TYPE = os.getenv("RETRIEVER_SEARCH_TYPE", "similarity")
+# "dense" uses FAISS only; "hybrid" fuses FAISS with the BM25 index (src/rags/bm25.py),
+# taking RETRIEVER_FETCH_K candidates from each
+RETRIEVER_MODE = os.getenv("RETRIEVER_MODE", "dense").lower()
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
+RETRIEVER_SCORE_THRESHOLD = float(os.getenv("RETRIEVER_SCORE_THRESHOLD", "0.3"))
+RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", "20"))
+RETRIEVER_LAMBDA_MULT = float(os.getenv("RETRIEVER_LAMBDA_MULT", "0.5"))
+
+# Seconds the saved index must be left untouched before `reload_vectorstore`
+# picks it up, so a reload never reads a rebuild that is still being written
+INDEX_RELOAD_SETTLE = float(os.getenv("INDEX_RELOAD_SETTLE", "2"))
+
+# Process-wide retrieval state. The embedding model and the loaded index are
+# shared by every request; `_lock` only guards loading and swapping them.
+_lock = threading.RLock()
+_embeddings = None
+_vectorstore = None
+_retriever = None
+_loaded_mtime = None
+# Bumped whenever a different index is installed, so caches derived from the
+# old one (e.g. the semantic answer cache) know to drop their entries
+_index_version = 0
+
+
+def get_embeddings():
+    """Return the shared embedding model, loading it on first use"""
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _embeddings = HuggingFaceEmbeddings(
+                    model_name=EMBEDDING_MODEL_NAME,
+                    model_kwargs={'device': 'cpu'},
+                    encode_kwargs={'normalize_embeddings': True}
+                )
+    return _embeddings
+
+
+def make_retriever(vectorstore, search_type=None, k=None, score_threshold=None,
+                   fetch_k=None, lambda_mult=None, mode=None):
+    """
+    Build a retriever over `vectorstore`; unset arguments use the RETRIEVER_* settings.
+
+    Returns:
+        BaseRetriever: The configured retriever
+    """
+    if (mode or RETRIEVER_MODE) == "hybrid":
+        from src.rags.bm25 import HybridRetriever, load_or_build_bm25
+        return HybridRetriever(
+            vectorstore=vectorstore,
+            bm25=load_or_build_bm25(vectorstore, VECTORSTORE_PATH),
+            k=k or RETRIEVER_K,
+            fetch_k=max(fetch_k or RETRIEVER_FETCH_K, k or RETRIEVER_K),
+        )
+
+    search_type = search_type or RETRIEVER_SEARCH_TYPE
+    search_kwargs = {"k": k or RETRIEVER_K}
+    if search_type == "mmr":
+        search_kwargs["fetch_k"] = max(fetch_k or RETRIEVER_FETCH_K, search_kwargs["k"])
+        search_kwargs["lambda_mult"] = RETRIEVER_LAMBDA_MULT if lambda_mult is None else lambda_mult
+    elif search_type == "similarity_score_threshold":
+        search_kwargs["score_threshold"] = (
+            RETRIEVER_SCORE_THRESHOLD if score_threshold is None else score_threshold
+        )
+    return vectorstore.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
+
+
+def _index_mtime():
+    """Latest modification time of the files making up the saved index"""
+    mtimes = [
+        path.stat().st_mtime
+        for path in VECTORSTORE_PATH.glob("*")
+        if path.is_file()
+    ]
+    return max(mtimes) if mtimes else None
+
+
 def load_existing_vectorstore():
     """Load previously saved vectorstore"""
-    print("="*70)
-    print("LOADING EXISTING VECTORSTORE")
-    print("="*70)
-    print(f"✓ Found existing vectorstore at: {VECTORSTORE_PATH}")
-    print("  Loading...\n")
-    
-    embd = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
-    
-    vectorstore = FAISS.load_local(
-        VECTORSTORE_PATH, 
-        embd,
-        allow_dangerous_deserialization=True
-    )
-    
-    retriever = vectorstore.as_retriever()
-    print("✓ Vectorstore loaded successfully!\n")
-    
+    logger.info("Loading existing vectorstore from %s", VECTORSTORE_PATH)
+
+    embd = get_embeddings()
+
+    # Pickled docstore or memory-mapped index + SQLite docstore, see src/rags/store.py
+    vectorstore = load_vectorstore(VECTORSTORE_PATH, embd)
+
+    retriever = make_retriever(vectorstore)
+    logger.info("Vectorstore loaded (%d vectors)", vectorstore.index.ntotal)
+
     return vectorstore, retriever
 
 def create_new_vectorstore():
     """Create new vectorstore from JSON"""
-    print("="*70)
-    print("CREATING NEW VECTORSTORE")
-    print("="*70)
-    
-    # Construct path to JSON file
-    json_file_path = BASE_DIR / "school_data_cleaned.json"
-    if not os.path.exists(json_file_path):
-        print(f"⚠ Cleaned file not found, using original...")
-        json_file_path = BASE_DIR / "school_data.json"
-
-    print(f"Loading JSON file: {json_file_path}\n")
-
-    # Initialize embeddings
-    print("Loading Hugging Face embeddings model...")
-    embd = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
-    print("✓ Embeddings model loaded successfully!\n")
-
-    # Load JSON file
-    with open(json_file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    print(f"Total records: {len(data)}")
-
-    # Convert to Document objects
-    docs_list = []
-    for record in data:
-        doc = Document(
-            page_content=record.get('content', ''),
-            metadata={
-                "id": record.get('id', 0),
-                "url": record.get('url', ''),
-                "section": record.get('section', ''),
-                "subsection": record.get('subsection', '')
-            }
-        )
-        docs_list.append(doc)
-
-    print(f"✓ Created {len(docs_list)} documents from JSON\n")
-
-    # Split documents
-    print("Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=500, 
-        chunk_overlap=0
-    )
-    doc_splits = text_splitter.split_documents(docs_list)
-    print(f"✓ Created {len(doc_splits)} document chunks\n")
-
-    # Create vectorstore
-    print("Creating FAISS vectorstore...")
-    vectorstore = FAISS.from_documents(
-        documents=doc_splits,
-        embedding=embd
-    )
-    print("✓ Vectorstore created successfully!\n")
-
-    # Save vectorstore
-    print("Saving vectorstore to disk...")
-    vectorstore.save_local(VECTORSTORE_PATH)
-    print(f"✓ Vectorstore saved to '{VECTORSTORE_PATH}'\n")
+    # The indexing pipeline streams the JSON, splits, embeds and saves the index
+    from src.rags.indexer import build_index, default_source
+
+    logger.info("Creating new vectorstore from %s", default_source())
+    vectorstore, stats = build_index(full=True)
+    logger.info("Embedded %d document chunks from %d records (%.1f chunks/s), saved to %s",
+                stats["embedded"], stats["records"], stats["chunks_per_second"], VECTORSTORE_PATH)
 
     # Create retriever
-    retriever = vectorstore.as_retriever()
-    
-    print("="*70)
-    print("VECTORSTORE CREATED AND SAVED")
-    print("="*70 + "\n")
-    
+    retriever = make_retriever(vectorstore)
+
     return vectorstore, retriever
 
+def _install(vectorstore, retriever, mtime):
+    """
+    Publish a freshly loaded index as the process-wide one. `mtime` is the
+    saved index's modification time read before loading it, so a rebuild
+    landing during the load still looks changed to `reload_vectorstore`.
+    """
+    global _vectorstore, _retriever, _loaded_mtime, _index_version
+    _vectorstore, _retriever = vectorstore, retriever
+    _loaded_mtime = mtime
+    _index_version += 1
+
+
+def get_index_version():
+    """Return a counter identifying the currently installed index"""
+    return _index_version
+
+
 def get_vectorstore(force_recreate=False):
     """
     Get vectorstore - load existing or create new
-    
+
+    The vectorstore is loaded once per process and shared between threads;
+    later calls return the resident instance without touching the disk.
+
     Args:
         force_recreate (bool): If True, recreate even if exists
-    
+
     Returns:
         tuple: (vectorstore, retriever)
     """
-    
-    # Check if vectorstore exists and we don't want to force recreate
-    if VECTORSTORE_PATH.exists() and not force_recreate:
-        return load_existing_vectorstore()
-    else:
-        return create_new_vectorstore()
 
+    if _vectorstore is not None and not force_recreate:
+        return _vectorstore, _retriever
+
+    with _lock:
+        if _vectorstore is not None and not force_recreate:
+            return _vectorstore, _retriever
+
+        # Check if vectorstore exists and we don't want to force recreate
+        if VECTORSTORE_PATH.exists() and not force_recreate:
+            mtime = _index_mtime()
+            _install(*load_existing_vectorstore(), mtime)
+        else:
+            vectorstore, retriever = create_new_vectorstore()
+            _install(vectorstore, retriever, _index_mtime())
+        return _vectorstore, _retriever
+
+
+def warm_vectorstore():
+    """
+    Load the embedding model and index and run one query through them, so the
+    first real request does not pay for model initialisation.
+    """
+    _, retriever = get_vectorstore()
+    retriever.invoke("Sunmarke School")
+
+
+def reload_vectorstore(only_if_changed=False):
+    """
+    Hot reload the index from disk.
+
+    The new index is loaded next to the old one and swapped in atomically, so
+    requests in flight keep using the previous instance until they finish.
+
+    Args:
+        only_if_changed (bool): Skip the reload when the files on disk have
+            not been modified since they were last loaded, or were modified
+            less than INDEX_RELOAD_SETTLE seconds ago
+
+    Returns:
+        bool: True if a new index was loaded
+    """
+    with _lock:
+        mtime = _index_mtime()
+        if only_if_changed and _vectorstore is not None:
+            if mtime == _loaded_mtime:
+                return False
+            if mtime is not None and time.time() - mtime < INDEX_RELOAD_SETTLE:
+                logger.info("Saved index changed moments ago; reloading it on a later check")
+                return False
+        _install(*load_existing_vectorstore(), mtime)
+        return True
@@ -0,0 +1,116 @@
+# Local relevance scoring between retrieval and generation. Confident scores
+# decide a document directly; only borderline ones go to the LLM grader.
+import logging
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from src.rags.bm25 import tokenize
+
+logger = logging.getLogger(__name__)
+
+# "off", "lexical" or "cross-encoder" (falls back to lexical if the model cannot load)
+RERANK_MODE = os.getenv("RERANK_MODE", "off").lower()
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# Documents scoring at or above ACCEPT are kept and below REJECT dropped without
+# an LLM call; unset values use the scorer's defaults. The defaults are
+# conservative starting points, not calibrated on this corpus: check them
+# against the LLM grader with `python -m benchmarks.retrieval_eval --calibrate`
+# before enabling RERANK_MODE
+RERANK_ACCEPT_THRESHOLD = os.getenv("RERANK_ACCEPT_THRESHOLD")
+RERANK_REJECT_THRESHOLD = os.getenv("RERANK_REJECT_THRESHOLD")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it me my of on "
+    "or our the their there this to was what when where which who why will with you your".split()
+)
+
+
+class LexicalScorer:
+    """Share of the question's content words that occur in the document (0..1)."""
+
+    accept = 0.75
+    reject = 0.2
+
+    def score(self, question, texts):
+        terms = {t for t in tokenize(question) if t not in _STOPWORDS}
+        if not terms:
+            return np.full(len(texts), 0.5, dtype=np.float32)
+        return np.asarray(
+            [len(terms & set(tokenize(text))) / len(terms) for text in texts],
+            dtype=np.float32,
+        )
+
+
+class CrossEncoderScorer:
+    """CPU cross-encoder with batched inference; logits squashed to 0..1."""
+
+    accept = 0.7
+    reject = 0.05
+
+    def __init__(self, model_name=RERANK_MODEL_NAME, batch_size=RERANK_BATCH_SIZE):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+    def score(self, question, texts):
+        with self._lock:
+            logits = self.model.predict(
+                [(question, text) for text in texts],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+        return 1.0 / (1.0 + np.exp(-np.asarray(logits, dtype=np.float32)))
+
+
+class Reranker:
+    """Score, order and triage documents for a question."""
+
+    def __init__(self, scorer, accept=None, reject=None):
+        self.scorer = scorer
+        self.accept = scorer.accept if accept is None else float(accept)
+        self.reject = scorer.reject if reject is None else float(reject)
+
+    def triage(self, question, documents):
+        """
+        Order documents by score and decide the confident ones.
+
+        Returns:
+            tuple: (documents sorted by score, verdicts) where a verdict is
+            True (keep), False (drop) or None (borderline, ask the LLM grader)
+        """
+        if not documents:
+            return [], []
+        scores = self.scorer.score(question, [d.page_content for d in documents])
+        order = np.argsort(-scores, kind="stable")
+        ranked = [documents[i] for i in order]
+        verdicts = []
+        for i in order:
+            if scores[i] >= self.accept:
+                verdicts.append(True)
+            elif scores[i] < self.reject:
+                verdicts.append(False)
+            else:
+                verdicts.append(None)
+        return ranked, verdicts
+
+
+@lru_cache(maxsize=1)
+def get_reranker():
+    """Return the configured reranker, or None when reranking is off."""
+    if RERANK_MODE == "cross-encoder":
+        try:
+            scorer = CrossEncoderScorer()
+        except Exception as e:
+            logger.warning("Cross-encoder unavailable, falling back to lexical reranking: %s", e)
+            scorer = LexicalScorer()
+    elif RERANK_MODE == "lexical":
+        scorer = LexicalScorer()
+    else:
+        return None
+    return Reranker(scorer, RERANK_ACCEPT_THRESHOLD, RERANK_REJECT_THRESHOLD)
@@ -0,0 +1,345 @@
+"""
+On-disk formats and index types for the FAISS vectorstore.
+
+"pickle" is LangChain's `save_local` layout: `index.faiss` plus `index.pkl`,
+which holds every chunk and must be unpickled in full by each process.
+
+"mmap" keeps the same `index.faiss` but opens it memory-mapped, and stores
+the chunks in a read-only SQLite file (`docstore.db`) queried by id only
+when a search returns them. Nothing is unpickled, and several server
+workers share the index and docstore pages through the OS page cache.
+
+INDEX_TYPE picks the FAISS index built over the embeddings: "flat" (exact),
+"sq8" / "sq_fp16" (scalar quantised to int8 / float16), "ivfpq" (inverted
+lists of product-quantised codes) or "hnsw" (graph). Compressed types are
+trained when the index is fully rebuilt; every type loads transparently.
+
+    python -m src.rags.store convert --to mmap [--index-path PATH]
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Format written by the indexer and `convert`; loading detects the format from the files
+INDEX_FORMAT = os.getenv("INDEX_FORMAT", "pickle").lower()
+FORMATS = ("pickle", "mmap")
+
+FAISS_FILENAME = "index.faiss"
+PICKLE_FILENAME = "index.pkl"
+DOCSTORE_FILENAME = "docstore.db"
+
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat").lower()
+INDEX_TYPES = ("flat", "sq8", "sq_fp16", "ivfpq", "hnsw")
+# Index types whose vectors can be removed by position; the others are rebuilt
+# from scratch when chunks are deleted
+DELETABLE_INDEX_TYPES = ("flat", "sq8", "sq_fp16")
+
+# Build and search parameters. IVF_NLIST 0 picks about 4 * sqrt(vectors);
+# PQ_M sub-quantisers must divide the embedding dimension (384)
+INDEX_IVF_NLIST = int(os.getenv("INDEX_IVF_NLIST", "0"))
+INDEX_IVF_NPROBE = int(os.getenv("INDEX_IVF_NPROBE", "8"))
+INDEX_PQ_M = int(os.getenv("INDEX_PQ_M", "48"))
+INDEX_PQ_NBITS = int(os.getenv("INDEX_PQ_NBITS", "8"))
+INDEX_HNSW_M = int(os.getenv("INDEX_HNSW_M", "32"))
+INDEX_HNSW_EF_CONSTRUCTION = int(os.getenv("INDEX_HNSW_EF_CONSTRUCTION", "80"))
+INDEX_HNSW_EF_SEARCH = int(os.getenv("INDEX_HNSW_EF_SEARCH", "64"))
+
+# IO_FLAG_MMAP maps inverted lists; IO_FLAG_MMAP_IFC (newer FAISS) also maps
+# flat codes in place instead of copying them to the heap
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+
+def index_type_of(index):
+    """Name the INDEX_TYPES entry of a loaded FAISS index."""
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8" if index.sq.qtype == faiss.ScalarQuantizer.QT_8bit else "sq_fp16"
+    return "flat"
+
+
+def configure_search(index):
+    """Apply the search-time parameters, which FAISS does not persist."""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(INDEX_IVF_NPROBE, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = INDEX_HNSW_EF_SEARCH
+    return index
+
+
+def build_faiss_index(vectors, index_type=None):
+    """
+    Train and fill an index of `index_type` (default INDEX_TYPE) with `vectors`.
+
+    IVF and PQ sizes are reduced when there are too few vectors to train them.
+
+    Args:
+        vectors (np.ndarray): float32 array of shape (n, dim)
+        index_type (str): One of INDEX_TYPES
+
+    Returns:
+        faiss.Index: The populated index, in the same order as `vectors`
+    """
+    index_type = index_type or INDEX_TYPE
+    n, dim = vectors.shape
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit)
+    elif index_type == "sq_fp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, INDEX_HNSW_M)
+        index.hnsw.efConstruction = INDEX_HNSW_EF_CONSTRUCTION
+    elif index_type == "ivfpq":
+        if dim % INDEX_PQ_M:
+            raise ValueError(f"INDEX_PQ_M={INDEX_PQ_M} does not divide the dimension {dim}")
+        # k-means wants ~39 points per centroid
+        nlist = INDEX_IVF_NLIST or int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n // 39))
+        nbits = max(1, min(INDEX_PQ_NBITS, int(math.log2(max(n, 2)))))
+        if nbits != INDEX_PQ_NBITS:
+            logger.warning("Only %d vectors, training PQ with %d bits instead of %d",
+                           n, nbits, INDEX_PQ_NBITS)
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, INDEX_PQ_M, nbits)
+    else:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return configure_search(index)
+
+
+def detect_format(index_path):
+    """Return the format of the index saved at `index_path`, or None if there is none."""
+    index_path = Path(index_path)
+    if not (index_path / FAISS_FILENAME).exists():
+        return None
+    if (index_path / DOCSTORE_FILENAME).exists():
+        return "mmap"
+    if (index_path / PICKLE_FILENAME).exists():
+        return "pickle"
+    return None
+
+
+class _SQLiteReader:
+    """
+    A read-only connection to an immutable SQLite file, opened once and shared
+    by every thread. Holding the file open keeps this reader on the docstore
+    it was loaded with after a rebuild replaces the file, matching the FAISS
+    index mapped alongside it.
+    """
+
+    def __init__(self, path):
+        uri = f"{Path(path).resolve().as_uri()}?mode=ro&immutable=1"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def fetchall(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def fetchone(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteDocstore(Docstore):
+    """Chunks read lazily by docstore id."""
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def search(self, search):
+        row = self.reader.fetchone(
+            "SELECT page_content, metadata FROM chunks WHERE id = ?", (search,)
+        )
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+
+class SQLiteIdMap(Mapping):
+    """Read-only FAISS position -> docstore id mapping, backed by the same file."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._len = reader.fetchone("SELECT COUNT(*) FROM chunks")[0]
+
+    def __getitem__(self, position):
+        row = self.reader.fetchone(
+            "SELECT id FROM chunks WHERE pos = ?", (int(position),)
+        )
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def __iter__(self):
+        for (position,) in self.reader.fetchall("SELECT pos FROM chunks ORDER BY pos"):
+            yield position
+
+    def __len__(self):
+        return self._len
+
+    def items(self):
+        return self.reader.fetchall("SELECT pos, id FROM chunks ORDER BY pos")
+
+    def values(self):
+        return [row[0] for row in self.reader.fetchall("SELECT id FROM chunks ORDER BY pos")]
+
+
+def _check_pair(index, chunks, index_path):
+    # The two files are replaced one after the other, so a load racing a save
+    # can open a new docstore with an old index; mismatched sizes reveal it
+    if index.ntotal != chunks:
+        raise RuntimeError(
+            f"{index_path} has {index.ntotal} vectors but {chunks} chunks; "
+            "the index is being rewritten, load it again once the save finishes"
+        )
+
+
+def _load_mmap(index_path, embeddings, writable):
+    index_path = Path(index_path)
+    reader = _SQLiteReader(index_path / DOCSTORE_FILENAME)
+    if not writable:
+        try:
+            index = faiss.read_index(str(index_path / FAISS_FILENAME), MMAP_FLAGS)
+        except RuntimeError:
+            # IVF lists held in memory cannot be mapped with both flags set
+            index = faiss.read_index(
+                str(index_path / FAISS_FILENAME), MMAP_FLAGS & ~faiss.IO_FLAG_MMAP
+            )
+        id_map = SQLiteIdMap(reader)
+        _check_pair(index, len(id_map), index_path)
+        return FAISS(embeddings, index, SQLiteDocstore(reader), id_map)
+
+    # The indexer adds and deletes vectors, so it gets ordinary in-memory copies
+    index = faiss.read_index(str(index_path / FAISS_FILENAME))
+    docs, id_map = {}, {}
+    for position, doc_id, content, metadata in reader.fetchall(
+        "SELECT pos, id, page_content, metadata FROM chunks ORDER BY pos"
+    ):
+        id_map[position] = doc_id
+        docs[doc_id] = Document(id=doc_id, page_content=content, metadata=json.loads(metadata))
+    reader.close()
+    _check_pair(index, len(id_map), index_path)
+    return FAISS(embeddings, index, InMemoryDocstore(docs), id_map)
+
+
+def load_vectorstore(index_path, embeddings, writable=False):
+    """
+    Load the vectorstore saved at `index_path` in whichever format it is in.
+
+    Args:
+        index_path (Path): Directory of the saved index
+        embeddings (Embeddings): Query embedding model
+        writable (bool): Load a fully in-memory copy that supports add and delete
+
+    Returns:
+        FAISS: The loaded vectorstore
+    """
+    fmt = detect_format(index_path)
+    if fmt == "mmap":
+        vectorstore = _load_mmap(index_path, embeddings, writable)
+    elif fmt == "pickle":
+        vectorstore = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+    else:
+        raise FileNotFoundError(f"No saved index at {index_path}")
+    configure_search(vectorstore.index)
+    return vectorstore
+
+
+def _write_docstore(vectorstore, path):
+    tmp = path.with_suffix(".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute(
+            "CREATE TABLE chunks (pos INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+            "page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        rows = []
+        for position, doc_id in sorted(vectorstore.index_to_docstore_id.items()):
+            doc = vectorstore.docstore.search(doc_id)
+            rows.append((position, doc_id, doc.page_content, json.dumps(doc.metadata)))
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+
+def save_vectorstore(vectorstore, index_path, fmt=None):
+    """
+    Save `vectorstore` to `index_path` as `fmt` (default INDEX_FORMAT), removing
+    the other format's files so loading cannot pick up a stale docstore.
+
+    Each file is replaced atomically. Vectorstores already loaded keep using
+    the previous files: the mmap format holds both the FAISS file mapping and
+    the docstore connection open from load, so they stay a matching pair until
+    the process reloads.
+    """
+    fmt = fmt or INDEX_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown index format {fmt!r}, expected one of {FORMATS}")
+    index_path = Path(index_path)
+    index_path.mkdir(parents=True, exist_ok=True)
+
+    if fmt == "pickle":
+        vectorstore.save_local(index_path)
+        stale = index_path / DOCSTORE_FILENAME
+    else:
+        _write_docstore(vectorstore, index_path / DOCSTORE_FILENAME)
+        tmp = index_path / (FAISS_FILENAME + ".tmp")
+        faiss.write_index(vectorstore.index, str(tmp))
+        os.replace(tmp, index_path / FAISS_FILENAME)
+        stale = index_path / PICKLE_FILENAME
+    if stale.exists():
+        stale.unlink()
+
+
+def main(argv=None):
+    from src.rags.rag import VECTORSTORE_PATH, get_embeddings
+
+    parser = argparse.ArgumentParser(prog="python -m src.rags.store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="rewrite the saved index in another format")
+    convert.add_argument("--to", choices=FORMATS, default="mmap")
+    convert.add_argument("--index-path", type=Path, default=VECTORSTORE_PATH)
+    args = parser.parse_args(argv)
+
+    current = detect_format(args.index_path)
+    if current is None:
+        parser.error(f"no saved index at {args.index_path}")
+    if current == args.to:
+        print(f"✓ {args.index_path} is already in {args.to} format")
+        return
+    vectorstore = load_vectorstore(args.index_path, get_embeddings(), writable=True)
+    save_vectorstore(vectorstore, args.index_path, args.to)
+    print(f"✓ Converted {args.index_path} from {current} to {args.to} "
+          f"({vectorstore.index.ntotal} vectors)")
+
+
+if __name__ == "__main__":
+    main()
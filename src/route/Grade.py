@@ -1,9 +1,11 @@
 ## Grade documenr node
 # Retriver document  
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
 from pydantic import BaseModel, Field
-from src.llms.llm import Groqllm
+from src.llms.llm import get_llm, lazy_exports
+from src.cache.llm_cache import cached_chain
 from src.prompts.routerprompt import binary_system
 
 class Grader(BaseModel):
@@ -11,13 +13,6 @@ class Grader(BaseModel):
     binary_score: str = Field(description="binary score of the document, yes or no")
 
 
-
-llm = Groqllm().get_llm()
-
-structured_llm_grader=llm.with_structured_output(Grader)
-
-
-
 # Prompt
 
 grade_prompt = ChatPromptTemplate.from_messages(
@@ -27,7 +22,13 @@ grade_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-##chain the prompt with the LLM
-retrieval_grader = grade_prompt | structured_llm_grader
+##chain the prompt with the LLM, on first use
+@lru_cache(maxsize=1)
+def get_retrieval_grader():
+    structured_llm_grader = get_llm().with_structured_output(Grader)
+    return cached_chain("retrieval_grader", grade_prompt | structured_llm_grader, schema=Grader)
+
+
+__getattr__ = lazy_exports(__name__, {"retrieval_grader": get_retrieval_grader})
 
 
@@ -1,6 +1,8 @@
+from functools import lru_cache
 from pydantic import BaseModel,Field
 from langchain_core.prompts import ChatPromptTemplate
-from src.llms.llm import Groqllm
+from src.llms.llm import get_llm, lazy_exports
+from src.cache.llm_cache import cached_chain
 
 # Data model
 class GradeAnswer(BaseModel):
@@ -10,12 +12,6 @@ class GradeAnswer(BaseModel):
         description="Answer addresses the question, 'yes' or 'no'"
     )
 
-
-# LLM with function call
-
-llm = Groqllm().get_llm()
-structured_llm_grader = llm.with_structured_output(GradeAnswer)
-
 # Prompt
 system = """You are a grader assessing whether an answer addresses / resolves a question \n 
      Give a binary score 'yes' or 'no'. Yes' means that the answer resolves the question."""
@@ -26,5 +22,12 @@ answer_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-answer_grader = answer_prompt | structured_llm_grader
+# LLM with function call, built on first use
+@lru_cache(maxsize=1)
+def get_answer_grader():
+    structured_llm_grader = get_llm().with_structured_output(GradeAnswer)
+    return cached_chain("answer_grader", answer_prompt | structured_llm_grader, schema=GradeAnswer)
+
+
+__getattr__ = lazy_exports(__name__, {"answer_grader": get_answer_grader})
 
@@ -0,0 +1,43 @@
+### Combined generation grader
+# Groundedness and answer relevance from a single structured call
+from functools import lru_cache
+from pydantic import BaseModel, Field
+from langchain_core.prompts import ChatPromptTemplate
+from src.llms.llm import get_llm, lazy_exports
+from src.cache.llm_cache import cached_chain
+
+# Data model
+class GradeGeneration(BaseModel):
+    """Binary scores for groundedness and relevance of a generation."""
+
+    grounded: str = Field(
+        description="Answer is grounded in the facts, 'yes' or 'no'"
+    )
+    addresses_question: str = Field(
+        description="Answer addresses the question, 'yes' or 'no'"
+    )
+
+
+# Prompt
+system = """You are a grader assessing an LLM generation against a set of retrieved facts and a user question. \n
+     Give two binary scores 'yes' or 'no'. \n
+     'grounded': 'yes' means that the answer is grounded in / supported by the set of facts. \n
+     'addresses_question': 'yes' means that the answer resolves the question."""
+generation_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", system),
+        ("human", "Set of facts: \n\n {documents} \n\n User question: \n\n {question} \n\n LLM generation: {generation}"),
+    ]
+)
+
+# LLM with function call, built on first use
+@lru_cache(maxsize=1)
+def get_generation_grader():
+    structured_llm_grader = get_llm().with_structured_output(GradeGeneration)
+    return cached_chain(
+        "generation_grader", generation_prompt | structured_llm_grader, schema=GradeGeneration
+    )
+
+
+__getattr__ = lazy_exports(__name__, {"generation_grader": get_generation_grader})
+
@@ -1,7 +1,9 @@
 ### Hallucination Grader
+from functools import lru_cache
 from pydantic import BaseModel,Field
 from langchain_core.prompts import ChatPromptTemplate
-from src.llms.llm import Groqllm
+from src.llms.llm import get_llm, lazy_exports
+from src.cache.llm_cache import cached_chain
 # Data model
 class GradeHallucinations(BaseModel):
     """Binary score for hallucination present in generation answer."""
@@ -11,10 +13,6 @@ class GradeHallucinations(BaseModel):
     )
 
 
-# LLM with function call
-llm = Groqllm().get_llm()
-structured_llm_grader = llm.with_structured_output(GradeHallucinations)
-
 # Prompt
 system = """You are a grader assessing whether an LLM generation is grounded in / supported by a set of retrieved facts. \n 
      Give a binary score 'yes' or 'no'. 'Yes' means that the answer is grounded in / supported by the set of facts."""
@@ -25,5 +23,15 @@ hallucination_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-hallucination_grader = hallucination_prompt | structured_llm_grader
+# LLM with function call, built on first use
+@lru_cache(maxsize=1)
+def get_hallucination_grader():
+    structured_llm_grader = get_llm().with_structured_output(GradeHallucinations)
+    return cached_chain(
+        "hallucination_grader", hallucination_prompt | structured_llm_grader,
+        schema=GradeHallucinations,
+    )
+
+
+__getattr__ = lazy_exports(__name__, {"hallucination_grader": get_hallucination_grader})
 
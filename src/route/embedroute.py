@@ -0,0 +1,72 @@
+# Local router: nearest-centroid classification of the question embedding
+# against labelled exemplars, using the MiniLM model already loaded for RAG.
+import json
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+ROUTER_EXEMPLARS_PATH = Path(os.getenv(
+    "ROUTER_EXEMPLARS_PATH",
+    Path(__file__).resolve().parent / "router_exemplars.json",
+))
+
+
+class EmbeddingRouter:
+    """
+    Score a question against one centroid per datasource.
+
+    The confidence margin is the gap between the best and second-best
+    cosine similarity; callers fall back to the LLM router when it is small.
+    """
+
+    def __init__(self, exemplars_path=ROUTER_EXEMPLARS_PATH):
+        self.exemplars_path = Path(exemplars_path)
+        self._lock = threading.Lock()
+        self._labels = None
+        self._centroids = None
+
+    def _load(self):
+        from src.rags.rag import get_embeddings
+
+        with open(self.exemplars_path, "r", encoding="utf-8") as f:
+            exemplars = json.load(f)
+
+        embd = get_embeddings()
+        labels, centroids = [], []
+        for label, examples in exemplars.items():
+            vectors = np.asarray(embd.embed_documents(examples), dtype=np.float32)
+            centroid = vectors.mean(axis=0)
+            labels.append(label)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self._labels = labels
+        self._centroids = np.stack(centroids)
+
+    def classify(self, question):
+        """
+        Classify a question.
+
+        Args:
+            question (str): The user question
+
+        Returns:
+            tuple: (datasource, margin)
+        """
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    self._load()
+
+        from src.rags.rag import get_embeddings
+        embedding = np.asarray(get_embeddings().embed_query(question), dtype=np.float32)
+        scores = self._centroids @ embedding
+        order = np.argsort(scores)[::-1]
+        margin = float(scores[order[0]] - scores[order[1]]) if len(order) > 1 else 1.0
+        return self._labels[order[0]], margin
+
+
+@lru_cache(maxsize=1)
+def get_embedding_router():
+    return EmbeddingRouter()
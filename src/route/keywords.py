@@ -0,0 +1,131 @@
+# Precompiled keyword matching for the router heuristics.
+# Keyword sets are compiled once into a single trie-shaped regex per route, so
+# matching stays one linear scan per route however many terms are configured.
+import json
+import os
+import re
+from pathlib import Path
+
+ROUTER_KEYWORDS_PATH = Path(os.getenv(
+    "ROUTER_KEYWORDS_PATH",
+    Path(__file__).resolve().parent / "router_keywords.json",
+))
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def _trie_regex(terms):
+    """Build a regex alternation factored by common prefixes."""
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items())
+            if ch
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            body = branches[0]
+            # A term ending here makes the rest optional
+            return "(?:" + body + ")?" if "" in node else body
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Word-boundary-aware matcher for a set of keywords.
+
+    A keyword matches only as whole words ("hi" does not match "this"); a
+    trailing "*" turns it into a prefix ("admission*" matches "admissions").
+    """
+
+    def __init__(self, keywords):
+        whole = sorted({_normalize(k) for k in keywords if not k.endswith("*")})
+        prefixes = sorted({_normalize(k[:-1]) for k in keywords if k.endswith("*")})
+        parts = []
+        if whole:
+            parts.append(_trie_regex(whole) + r"(?!\w)")
+        if prefixes:
+            parts.append(_trie_regex(prefixes) + r"\w*")
+        self.pattern = (
+            re.compile(r"(?<!\w)(?:" + "|".join(parts) + ")") if parts else None
+        )
+
+    def search(self, text):
+        """Return the first matching keyword occurrence in `text`, or None."""
+        if self.pattern is None:
+            return None
+        match = self.pattern.search(text.lower())
+        return match.group(0) if match else None
+
+
+class TopicDetector:
+    """
+    Detect external topics a question asks about alongside the school one,
+    e.g. "AI", whose answers are augmented with a web search summary.
+    """
+
+    def __init__(self, topics):
+        self.topics = [(topic["topic"], KeywordMatcher(topic["keywords"])) for topic in topics]
+
+    @classmethod
+    def from_file(cls, path=ROUTER_KEYWORDS_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f).get("augment_topics", []))
+
+    def detect(self, question):
+        """Return the first topic mentioned in the question, or None."""
+        for topic, matcher in self.topics:
+            if matcher.search(question):
+                return topic
+        return None
+
+
+class RouteKeywords:
+    """Ordered keyword routes loaded from a JSON config file."""
+
+    def __init__(self, routes):
+        self.routes = [
+            (
+                route["route"],
+                {_normalize(e) for e in route.get("exact", [])},
+                KeywordMatcher(route.get("keywords", [])),
+            )
+            for route in routes
+        ]
+
+    @classmethod
+    def from_file(cls, path=ROUTER_KEYWORDS_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["routes"])
+
+    def match(self, question):
+        """
+        Return the first route whose keywords match the question.
+
+        Args:
+            question (str): The user question
+
+        Returns:
+            tuple: (route, matched keyword) or (None, None)
+        """
+        normalized = _normalize(question)
+        for route, exact, matcher in self.routes:
+            if normalized in exact:
+                return route, normalized
+            keyword = matcher.search(normalized)
+            if keyword:
+                return route, keyword
+        return None, None
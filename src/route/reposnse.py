@@ -1,19 +1,34 @@
 ## Generate a response
-from src.llms.llm import Groqllm
+from functools import lru_cache
+from src.llms.llm import get_llm, lazy_exports
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 # Create your own RAG prompt
 prompt = ChatPromptTemplate.from_messages([
     ("system", "You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. If you don't know the answer, just say that you don't know. Use three sentences maximum and keep the answer concise."),
+    # Earlier conversation, if any, so follow-up questions make sense
+    MessagesPlaceholder("history", optional=True),
     ("human", "Question: {question}\n\nContext: {context}\n\nAnswer:")
 ])
 
-llm = Groqllm().get_llm()
-
 # Post-processing
 def format_docs(docs):
     return "\n\n".join(doc.page_content for doc in docs)
 
-# Chain
-rag_chain = prompt | llm | StrOutputParser()
\ No newline at end of file
+# Tag attached to runs whose tokens are the user-facing answer, so streaming
+# consumers can tell them apart from router/grader calls
+ANSWER_TAG = "answer"
+
+# Chain, built on first use
+@lru_cache(maxsize=1)
+def get_answer_chain():
+    return prompt | get_llm() | StrOutputParser()
+
+
+@lru_cache(maxsize=1)
+def get_rag_chain():
+    return get_answer_chain().with_config(tags=[ANSWER_TAG])
+
+
+__getattr__ = lazy_exports(__name__, {"answer_chain": get_answer_chain, "rag_chain": get_rag_chain})
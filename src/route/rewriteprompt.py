@@ -1,15 +1,13 @@
 # if the Answer Grader are return the no it use th ere writer to better making the question to give answer form vectorstore retriever
-from pydantic import BaseModel,Field
+from functools import lru_cache
 from langchain_core.prompts import ChatPromptTemplate
-from src.llms.llm import Groqllm
+from src.llms.llm import get_llm, lazy_exports
+from src.cache.llm_cache import cached_chain
 from langchain_core.output_parsers import StrOutputParser
 
 system = """You a question re-writer that converts an input question to a better version that is optimized \n 
      for vectorstore retrieval. Look at the input and try to reason about the underlying semantic intent / meaning."""
 
-
-llm=Groqllm().get_llm()
-
 re_write_prompt = ChatPromptTemplate.from_messages(
     [
         ("system", system),
@@ -20,4 +18,9 @@ re_write_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-question_rewriter = re_write_prompt | llm | StrOutputParser()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_question_rewriter():
+    return cached_chain("question_rewriter", re_write_prompt | get_llm() | StrOutputParser())
+
+
+__getattr__ = lazy_exports(__name__, {"question_rewriter": get_question_rewriter})
@@ -1,10 +1,12 @@
 # Making a router that can route to chat, web search, or vectorstore retriever
+from functools import lru_cache
 from typing import Literal
 
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
-from src.llms.llm import Groqllm
+from src.llms.llm import get_llm, lazy_exports
+from src.cache.llm_cache import cached_chain
 #router prompt
 from src.prompts.routerprompt import system
 
@@ -19,11 +21,6 @@ class RouteQuery(BaseModel):
         description="Given a user question choose to route it to web search, vectorstore, or chat.",
     )
 
-# llm from llms folder 
-    
-llm=Groqllm().get_llm()
-
-structured_llm_router = llm.with_structured_output(RouteQuery)
 route_prompt = ChatPromptTemplate.from_messages(
     [
         ("system", system),
@@ -31,5 +28,12 @@ route_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-question_router = route_prompt | structured_llm_router
+# llm from llms folder, built on first use
+@lru_cache(maxsize=1)
+def get_question_router():
+    structured_llm_router = get_llm().with_structured_output(RouteQuery)
+    return cached_chain("question_router", route_prompt | structured_llm_router, schema=RouteQuery)
+
+
+__getattr__ = lazy_exports(__name__, {"question_router": get_question_router})
 
@@ -1,11 +1,359 @@
+# Web search for the graph: a provider (Tavily over pooled HTTP connections,
+# or a local fixture file) behind a wrapper that caches results per normalized
+# query, coalesces concurrent identical searches into one call and bounds each
+# call by a deadline, falling back to stale cached or empty results.
+import asyncio
+import json
+import logging
 import os
-from dotenv import load_dotenv
-from langchain_tavily import TavilySearch
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from pathlib import Path
 
-load_dotenv()
+from src.llms.llm import lazy_exports, load_env
+from src.observability.tracing import record_cache_lookup
 
-tavily_api_key = os.getenv("TAVILY_API_KEY")
-if not tavily_api_key:
-    raise ValueError("Error: TAVILY_API_KEY not found in .env file")
+logger = logging.getLogger(__name__)
 
-web_search_tool = TavilySearch(k=1)
+# "tavily", "fixture" or "off"
+WEB_SEARCH_PROVIDER = os.getenv("WEB_SEARCH_PROVIDER", "tavily").lower()
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "5"))
+# Seconds a caller waits for results before falling back
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "5"))
+# Seconds results are served from the cache (0 disables it), and how long
+# expired results are still kept as a fallback when a search fails or is late
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", "900"))
+WEB_SEARCH_STALE_TTL = float(os.getenv("WEB_SEARCH_STALE_TTL", "86400"))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "1024"))
+# Connection pool size, which also bounds concurrent searches
+WEB_SEARCH_MAX_CONNECTIONS = int(os.getenv("WEB_SEARCH_MAX_CONNECTIONS", "10"))
+WEB_SEARCH_FIXTURE_PATH = Path(os.getenv(
+    "WEB_SEARCH_FIXTURE_PATH",
+    Path(__file__).resolve().parent / "web_search_fixtures.json",
+))
+
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,;:]+$")
+
+# Async provider calls in flight. The event loop only keeps weak references to
+# tasks, so these are held here until they finish
+_background_tasks = set()
+
+
+def normalize_query(query):
+    """Cache key of a query: case, spacing and trailing punctuation ignored."""
+    if isinstance(query, dict):
+        query = query.get("query", "")
+    return _TRAILING_PUNCTUATION.sub("", " ".join(str(query).lower().split()))
+
+
+class SearchProvider:
+    """
+    A web search backend. `search` and `asearch` return a list of
+    {"url": ..., "content": ...} results, best first.
+    """
+
+    name = None
+
+    def search(self, query, max_results):
+        raise NotImplementedError
+
+    async def asearch(self, query, max_results):
+        return await asyncio.to_thread(self.search, query, max_results)
+
+    def close(self):
+        pass
+
+
+class TavilyProvider(SearchProvider):
+    """Tavily's search API over keep-alive HTTP connection pools."""
+
+    name = "tavily"
+
+    def __init__(self, api_key, max_connections=WEB_SEARCH_MAX_CONNECTIONS):
+        import httpx
+
+        self._httpx = httpx
+        self._headers = {"Authorization": f"Bearer {api_key}"}
+        self._limits = httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        )
+        # Longer than the caller deadline: a late response still fills the cache
+        self._timeout = httpx.Timeout(max(WEB_SEARCH_TIMEOUT * 3, 10.0))
+        self._client = httpx.Client(headers=self._headers, limits=self._limits,
+                                    timeout=self._timeout)
+        self._lock = threading.Lock()
+        self._async_clients = {}  # event loop -> AsyncClient
+
+    def _async_client(self):
+        # An AsyncClient's connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                for other in [l for l in self._async_clients if l.is_closed()]:
+                    del self._async_clients[other]
+                client = self._httpx.AsyncClient(headers=self._headers, limits=self._limits,
+                                                 timeout=self._timeout)
+                self._async_clients[loop] = client
+            return client
+
+    @staticmethod
+    def _payload(query, max_results):
+        return {"query": query, "max_results": max_results, "search_depth": "basic"}
+
+    @staticmethod
+    def _results(response):
+        response.raise_for_status()
+        return [
+            {"url": r.get("url", ""), "content": r.get("content", "")}
+            for r in response.json().get("results", [])
+        ]
+
+    def search(self, query, max_results):
+        return self._results(self._client.post(TAVILY_SEARCH_URL,
+                                               json=self._payload(query, max_results)))
+
+    async def asearch(self, query, max_results):
+        response = await self._async_client().post(TAVILY_SEARCH_URL,
+                                                   json=self._payload(query, max_results))
+        return self._results(response)
+
+    def close(self):
+        self._client.close()
+
+
+class FixtureProvider(SearchProvider):
+    """
+    Canned results from a JSON file mapping queries to result lists, for tests
+    and offline runs. Queries are matched after `normalize_query`; a "*" entry,
+    if present, answers every other query.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path=WEB_SEARCH_FIXTURE_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures = json.load(f)
+        self.fixtures = {
+            (key if key == "*" else normalize_query(key)): results
+            for key, results in fixtures.items()
+        }
+
+    def search(self, query, max_results):
+        results = self.fixtures.get(normalize_query(query), self.fixtures.get("*", []))
+        return [dict(r) for r in results[:max_results]]
+
+    async def asearch(self, query, max_results):
+        return self.search(query, max_results)
+
+
+class _ResultCache:
+    """LRU of results per query, kept for `stale_ttl` and fresh for `ttl`."""
+
+    def __init__(self, ttl, stale_ttl, max_entries):
+        self.ttl = ttl
+        self.stale_ttl = max(ttl, stale_ttl)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (results, stored_at)
+
+    def get(self, key, max_age):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.time() - entry[1]
+            if age > self.stale_ttl:
+                del self._entries[key]
+                return None
+            if age > max_age:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, results):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (results, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class WebSearch:
+    """
+    Cached, coalesced and deadline-bounded search over a `SearchProvider`.
+
+    Concurrent callers with the same normalized query share one in-flight
+    provider call. A caller that hits the deadline gets the last known results
+    for the query (or none) while the call carries on and fills the cache.
+
+    Args:
+        provider (SearchProvider): Backend to query
+        max_results (int): Results requested per query
+        timeout (float): Seconds a caller waits for the provider
+        ttl (float): Seconds results are reused; 0 disables caching
+        stale_ttl (float): Seconds expired results remain usable as a fallback
+        max_entries (int): Cached queries kept
+    """
+
+    def __init__(self, provider, max_results=WEB_SEARCH_MAX_RESULTS, timeout=WEB_SEARCH_TIMEOUT,
+                 ttl=WEB_SEARCH_CACHE_TTL, stale_ttl=WEB_SEARCH_STALE_TTL,
+                 max_entries=WEB_SEARCH_CACHE_MAX_ENTRIES):
+        self.provider = provider
+        self.max_results = max_results
+        self.timeout = timeout
+        self.cache = _ResultCache(ttl, stale_ttl, max_entries)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future shared by every waiter
+        self._pool = ThreadPoolExecutor(max_workers=WEB_SEARCH_MAX_CONNECTIONS,
+                                        thread_name_prefix="web-search")
+
+    def _cached(self, key):
+        if self.cache.ttl <= 0:
+            return None
+        results = self.cache.get(key, self.cache.ttl)
+        record_cache_lookup("web_search", results is not None)
+        return results
+
+    def _fallback(self, key, query, reason):
+        results = self.cache.get(key, self.cache.stale_ttl)
+        logger.warning("Web search for %r %s; using %s", query, reason,
+                       "stale cached results" if results is not None else "no results")
+        return results if results is not None else []
+
+    def _join(self, key, start):
+        """The in-flight future for `key`, started with `start()` if there is none."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = start()
+            self._inflight[key] = future
+        future.add_done_callback(lambda f: self._finish(key, f))
+        return future
+
+    def _finish(self, key, future):
+        # Cache first, so no caller starts a second search between the two steps
+        if future.exception() is None:
+            self.cache.set(key, future.result())
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def search(self, query):
+        """
+        Search the web.
+
+        Args:
+            query (str): The search query
+
+        Returns:
+            list: {"url", "content"} results, possibly empty
+        """
+        key = normalize_query(query)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        future = self._join(key, lambda: self._pool.submit(
+            self.provider.search, query, self.max_results
+        ))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            return self._fallback(key, query, f"exceeded {self.timeout}s")
+        except Exception as e:
+            return self._fallback(key, query, f"failed: {e}")
+
+    def _start_async(self, query):
+        future = Future()
+        task = asyncio.get_running_loop().create_task(
+            self.provider.asearch(query, self.max_results)
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+        def transfer(task):
+            if task.cancelled():
+                future.set_exception(RuntimeError("web search cancelled"))
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        task.add_done_callback(transfer)
+        return future
+
+    async def asearch(self, query):
+        """Async variant of `search`."""
+        key = normalize_query(query)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        future = self._join(key, lambda: self._start_async(query))
+        waiter = asyncio.wrap_future(future)
+        # Once a caller times out nothing awaits its waiter; retrieve the
+        # outcome so a late failure is not reported as never retrieved
+        waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            # Shielded so a timed-out caller does not cancel the shared call
+            return await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            return self._fallback(key, query, f"exceeded {self.timeout}s")
+        except Exception as e:
+            return self._fallback(key, query, f"failed: {e}")
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.provider.close()
+
+
+def get_search_provider():
+    """
+    The configured search provider.
+
+    Returns:
+        SearchProvider: The provider, or None when web search is off or
+        TAVILY_API_KEY is not set
+    """
+    if WEB_SEARCH_PROVIDER == "off":
+        return None
+    if WEB_SEARCH_PROVIDER == "fixture":
+        return FixtureProvider()
+    if WEB_SEARCH_PROVIDER != "tavily":
+        raise ValueError(f"Unknown WEB_SEARCH_PROVIDER {WEB_SEARCH_PROVIDER!r}")
+
+    load_env()
+    api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key:
+        logger.warning("TAVILY_API_KEY not found in .env file; web search is disabled")
+        return None
+    return TavilyProvider(api_key)
+
+
+@lru_cache(maxsize=1)
+def get_web_search_tool():
+    """
+    The shared web search, built on first use.
+
+    Returns:
+        WebSearch: The search wrapper, or None when web search is disabled;
+        the rest of the graph keeps working without it
+    """
+    provider = get_search_provider()
+    return WebSearch(provider) if provider is not None else None
+
+
+__getattr__ = lazy_exports(__name__, {"web_search_tool": get_web_search_tool})
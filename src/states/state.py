@@ -1,5 +1,6 @@
 from typing import List
 
+from langchain_core.messages import BaseMessage
 from typing_extensions import TypedDict
 
 
@@ -11,8 +12,14 @@ class GraphState(TypedDict):
         question: question
         generation: LLM generation
         documents: list of documents
+        datasource: branch that produced the documents (vectorstore, web_search or chat)
+        augmentation: web summary appended to the answer, kept across generate retries
+        history: earlier conversation, bounded by src/memory/conversation.py
     """
 
     question: str
     generation: str
-    documents: List[str]
\ No newline at end of file
+    documents: List[str]
+    datasource: str
+    augmentation: str
+    history: List[BaseMessage]
@@ -0,0 +1,57 @@
+import pytest
+
+from src.route.keywords import KeywordMatcher, RouteKeywords, TopicDetector
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("What is the fee?", "fee"),
+    ("What are the fees?", "fees"),
+    ("Any feedback on the fee?", "fee"),
+    ("I have some feedback", None),
+    ("coffee", None),
+    ("thank   you", "thank   you"),
+    ("thankyou", None),
+])
+def test_whole_word_keywords(text, expected):
+    assert KeywordMatcher(["fee", "fees", "thank you"]).search(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("admission", "admission"),
+    ("Admissions are open", "admissions"),
+    ("readmission", None),
+    ("sunmarke's campus", "sunmarke"),
+])
+def test_prefix_keywords(text, expected):
+    assert KeywordMatcher(["admission*", "sunmark*"]).search(text) == expected
+
+
+def test_empty_matcher():
+    assert KeywordMatcher([]).search("anything") is None
+
+
+@pytest.fixture(scope="module")
+def routes():
+    return RouteKeywords.from_file()
+
+
+@pytest.mark.parametrize("question, route", [
+    ("hi", "chat"),
+    ("Hello   there", "chat"),
+    ("this is about history", None),
+    ("What are the school fees?", "vectorstore"),
+    ("Can I give feedback?", None),
+    ("How do admissions work?", "vectorstore"),
+    ("What's the latest news?", "web_search"),
+    ("What is the weather today", "web_search"),
+    ("Tell me about the ibis", None),
+])
+def test_shipped_routes(routes, question, route):
+    assert routes.match(question)[0] == route
+
+
+def test_topics_match_whole_words():
+    detector = TopicDetector.from_file()
+    assert detector.detect("How is AI used in class?") == "AI"
+    assert detector.detect("Does the school teach artificial intelligence?") == "AI"
+    assert detector.detect("She said the main hall is open") is None
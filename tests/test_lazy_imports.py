@@ -0,0 +1,21 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.import_time import LAZY_MODULES
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_graph_import_does_not_load_llm_or_search_sdks():
+    env = {k: v for k, v in os.environ.items() if k not in ("GROQ_API_KEY", "TAVILY_API_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import json, sys, src.graphs.graph; print(json.dumps(sorted(sys.modules)))"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    loaded = {name.split(".")[0] for name in json.loads(result.stdout.splitlines()[-1])}
+
+    assert not loaded & {*LAZY_MODULES, "tavily"}
@@ -0,0 +1,77 @@
+import os
+import time
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.rags import rag
+from src.rags.store import save_vectorstore
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    """An empty process-wide vectorstore state pointing at a temporary index."""
+    index_path = tmp_path / "index"
+    monkeypatch.setattr(rag, "VECTORSTORE_PATH", index_path)
+    monkeypatch.setattr(rag, "_embeddings", DeterministicFakeEmbedding(size=32))
+    monkeypatch.setattr(rag, "_vectorstore", None)
+    monkeypatch.setattr(rag, "_retriever", None)
+    monkeypatch.setattr(rag, "_loaded_mtime", None)
+    monkeypatch.setattr(rag, "_index_version", 0)
+    return index_path
+
+
+def build(index_path, texts, fmt):
+    save_vectorstore(FAISS.from_texts(texts, rag.get_embeddings()), index_path, fmt)
+    # Age the files past the settle window, as a finished rebuild would be
+    past = time.time() - rag.INDEX_RELOAD_SETTLE - 1
+    for path in index_path.iterdir():
+        os.utime(path, (past, past))
+
+
+def top_hit(query):
+    _, retriever = rag.get_vectorstore()
+    return retriever.invoke(query)[0].page_content
+
+
+@pytest.mark.parametrize("fmt", ["pickle", "mmap"])
+def test_rebuilt_index_is_served_after_reload(index_dir, fmt):
+    build(index_dir, ["old fees", "old uniform"], fmt)
+    assert top_hit("old fees") == "old fees"
+    version = rag.get_index_version()
+
+    assert rag.reload_vectorstore(only_if_changed=True) is False
+
+    build(index_dir, ["new fees", "new uniform", "new buses"], fmt)
+    assert rag.reload_vectorstore(only_if_changed=True) is True
+    assert rag.get_index_version() == version + 1
+    assert top_hit("new buses") == "new buses"
+    assert rag.get_vectorstore()[0].index.ntotal == 3
+
+
+def test_reload_waits_for_a_rebuild_to_settle(index_dir):
+    build(index_dir, ["old fees"], "pickle")
+    rag.get_vectorstore()
+
+    save_vectorstore(FAISS.from_texts(["new fees"], rag.get_embeddings()), index_dir, "pickle")
+    assert rag.reload_vectorstore(only_if_changed=True) is False
+    assert top_hit("new fees") == "old fees"
+
+
+def test_rebuild_during_load_is_reloaded_later(index_dir, monkeypatch):
+    build(index_dir, ["old fees"], "pickle")
+    load = rag.load_existing_vectorstore
+
+    def load_then_rebuild():
+        loaded = load()
+        # A rebuild finishes after the old files were read
+        build(index_dir, ["new fees", "new buses"], "pickle")
+        return loaded
+
+    monkeypatch.setattr(rag, "load_existing_vectorstore", load_then_rebuild)
+    assert top_hit("old fees") == "old fees"
+    monkeypatch.setattr(rag, "load_existing_vectorstore", load)
+
+    assert rag.reload_vectorstore(only_if_changed=True) is True
+    assert top_hit("new buses") == "new buses"
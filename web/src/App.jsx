@@ -11,6 +11,11 @@ import {
 
 const TOKEN_KEY = "sunmark_auth_token";
 
+// Message pages come newest first; the chat shows them oldest first
+function chronological(page) {
+  return [...page.items].reverse();
+}
+
 function formatTime(value) {
   if (!value) return "";
   try {
@@ -27,8 +32,10 @@ export default function App() {
   const [token, setToken] = useState(() => localStorage.getItem(TOKEN_KEY) || "");
   const [user, setUser] = useState(null);
   const [sessions, setSessions] = useState([]);
+  const [sessionsCursor, setSessionsCursor] = useState(null);
   const [activeSessionId, setActiveSessionId] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [messagesCursor, setMessagesCursor] = useState(null);
   const [authMode, setAuthMode] = useState("login");
   const [email, setEmail] = useState("");
   const [password, setPassword] = useState("");
@@ -39,6 +46,7 @@ export default function App() {
   const [error, setError] = useState("");
   const messagesRequestIdRef = useRef(0);
   const messagesContainerRef = useRef(null);
+  const keepScrollRef = useRef(false);
 
   const activeSession = useMemo(
     () => sessions.find((s) => s.id === activeSessionId) || null,
@@ -57,8 +65,10 @@ export default function App() {
     setToken("");
     setUser(null);
     setSessions([]);
+    setSessionsCursor(null);
     setActiveSessionId(null);
     setMessages([]);
+    setMessagesCursor(null);
     setDraft("");
     setError(nextError);
   }
@@ -83,13 +93,14 @@ export default function App() {
       setLoading(true);
       setError("");
       try {
-        const [me, allSessions] = await Promise.all([
+        const [me, page] = await Promise.all([
           getCurrentUser(token),
           listSessions(token)
         ]);
         setUser(me);
-        setSessions(allSessions);
-        setActiveSessionId((prev) => prev || allSessions[0]?.id || null);
+        setSessions(page.items);
+        setSessionsCursor(page.next_cursor);
+        setActiveSessionId((prev) => prev || page.items[0]?.id || null);
       } catch (err) {
         resetAuthState(err.message);
       } finally {
@@ -103,15 +114,17 @@ export default function App() {
     async function loadMessages() {
       if (!token || !activeSessionId) {
         setMessages([]);
+        setMessagesCursor(null);
         return;
       }
       const requestId = ++messagesRequestIdRef.current;
       setLoading(true);
       setError("");
       try {
-        const items = await listMessages(token, activeSessionId);
+        const page = await listMessages(token, activeSessionId);
         if (requestId !== messagesRequestIdRef.current) return;
-        setMessages(items);
+        setMessages(chronological(page));
+        setMessagesCursor(page.next_cursor);
       } catch (err) {
         if (requestId !== messagesRequestIdRef.current) return;
         if (isUnauthorized(err)) {
@@ -129,6 +142,11 @@ export default function App() {
 
   useEffect(() => {
     if (!messagesContainerRef.current) return;
+    if (keepScrollRef.current) {
+      // Older messages were prepended; stay where the reader is
+      keepScrollRef.current = false;
+      return;
+    }
     messagesContainerRef.current.scrollTo({
       top: messagesContainerRef.current.scrollHeight,
       behavior: "smooth"
@@ -166,10 +184,12 @@ export default function App() {
     setError("");
     try {
       const session = await createSession(token);
-      const allSessions = await listSessions(token);
-      setSessions(allSessions);
+      const page = await listSessions(token);
+      setSessions(page.items);
+      setSessionsCursor(page.next_cursor);
       setActiveSessionId(session.id);
       setMessages([]);
+      setMessagesCursor(null);
     } catch (err) {
       if (isUnauthorized(err)) {
         resetAuthState("Session expired. Please log in again.");
@@ -210,8 +230,15 @@ export default function App() {
 
       setMessages((prev) => [...prev, tempUserMessage]);
       const res = await sendMessage(token, sessionId, text);
-      const refreshed = await listMessages(token, sessionId);
-      setMessages(refreshed);
+      // The session moves to the top of the activity-sorted list
+      const [refreshed, sessionsPage] = await Promise.all([
+        listMessages(token, sessionId),
+        listSessions(token)
+      ]);
+      setMessages(chronological(refreshed));
+      setMessagesCursor(refreshed.next_cursor);
+      setSessions(sessionsPage.items);
+      setSessionsCursor(sessionsPage.next_cursor);
 
       if (!res.response) {
         setError("No response from chat service.");
@@ -230,6 +257,47 @@ export default function App() {
     }
   }
 
+  async function handleMoreSessions() {
+    if (!token || !sessionsCursor) return;
+    setLoading(true);
+    setError("");
+    try {
+      const page = await listSessions(token, sessionsCursor);
+      setSessions((prev) => [...prev, ...page.items]);
+      setSessionsCursor(page.next_cursor);
+    } catch (err) {
+      if (isUnauthorized(err)) {
+        resetAuthState("Session expired. Please log in again.");
+        return;
+      }
+      setError(err.message);
+    } finally {
+      setLoading(false);
+    }
+  }
+
+  async function handleOlderMessages() {
+    if (!token || !activeSessionId || !messagesCursor) return;
+    const requestId = messagesRequestIdRef.current;
+    setLoading(true);
+    setError("");
+    try {
+      const page = await listMessages(token, activeSessionId, messagesCursor);
+      if (requestId !== messagesRequestIdRef.current) return;
+      keepScrollRef.current = true;
+      setMessages((prev) => [...chronological(page), ...prev]);
+      setMessagesCursor(page.next_cursor);
+    } catch (err) {
+      if (isUnauthorized(err)) {
+        resetAuthState("Session expired. Please log in again.");
+        return;
+      }
+      setError(err.message);
+    } finally {
+      setLoading(false);
+    }
+  }
+
   function handleLogout() {
     resetAuthState("");
   }
@@ -327,11 +395,24 @@ export default function App() {
                 }`}
                 onClick={() => setActiveSessionId(session.id)}
               >
-                <span>{getSessionLabel(session)}</span>
-                <small>{formatTime(session.created_at)}</small>
+                <span className="session-text">
+                  <span>{getSessionLabel(session)}</span>
+                  {session.last_message_preview ? (
+                    <small className="session-preview">{session.last_message_preview}</small>
+                  ) : null}
+                </span>
+                <small>
+                  {formatTime(session.last_message_at || session.created_at)}
+                  {session.message_count ? ` · ${session.message_count}` : ""}
+                </small>
               </button>
             ))
           )}
+          {sessionsCursor ? (
+            <button className="load-more" onClick={handleMoreSessions} disabled={loading}>
+              Load more
+            </button>
+          ) : null}
         </div>
       </aside>
 
@@ -349,6 +430,11 @@ export default function App() {
         </header>
 
         <div className="messages" ref={messagesContainerRef}>
+          {messagesCursor ? (
+            <button className="load-more" onClick={handleOlderMessages} disabled={loading}>
+              Load older messages
+            </button>
+          ) : null}
           {messages.length === 0 ? (
             <div className="empty-state">
               <h3>Ask anything about Sunmarke School</h3>
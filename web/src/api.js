@@ -33,6 +33,10 @@ async function request(path, options = {}) {
   return res.json();
 }
 
+function withCursor(path, cursor) {
+  return cursor ? `${path}?cursor=${encodeURIComponent(cursor)}` : path;
+}
+
 export async function register(email, password) {
   return request("/register", {
     method: "POST",
@@ -65,14 +69,15 @@ export async function createSession(token) {
   });
 }
 
-export async function listSessions(token) {
-  return request("/chat/sessions", {
+// Both lists are paginated newest first: { items, next_cursor }
+export async function listSessions(token, cursor = null) {
+  return request(withCursor("/chat/sessions", cursor), {
     headers: { Authorization: `Bearer ${token}` }
   });
 }
 
-export async function listMessages(token, sessionId) {
-  return request(`/chat/${sessionId}/messages`, {
+export async function listMessages(token, sessionId, cursor = null) {
+  return request(withCursor(`/chat/${sessionId}/messages`, cursor), {
     headers: { Authorization: `Bearer ${token}` }
   });
 }